@@ -0,0 +1,232 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+class ParticleAnalyzer:
+
+    # Approximate working memory per voxel of a chunk: mask, local labels,
+    # 64-bit global labels and the coordinate weights used by the reductions.
+    BYTES_PER_VOXEL = 40
+
+    COLUMNS = ("label", "voxel_count", "volume", "surface_area", "equivalent_diameter",
+               "centroid_z", "centroid_y", "centroid_x")
+
+    def __init__(self, volume, spacing=(1.0, 1.0, 1.0), connectivity=26, memory_budget=512 * 1024 ** 2):
+        """
+        Label connected particles or pores in a volume and measure each of them.
+        volume: 3D array (depth, height, width); may be a np.memmap.
+        spacing: voxel size along (z, y, x) in physical units.
+        connectivity: 6 (faces), 18 (faces and edges) or 26 (faces, edges and corners).
+        memory_budget: approximate bytes of working memory; the volume is
+        processed in z-chunks sized to fit it.
+        """
+        if connectivity not in (6, 18, 26):
+            raise ValueError("connectivity must be 6, 18 or 26.")
+        self.volume = volume
+        self.spacing = tuple(float(s) for s in spacing)
+        self.connectivity = connectivity
+        self.memory_budget = memory_budget
+        self.labels = None
+        self.num_labels = 0
+        self.measurements = None
+
+    def _chunk_depth(self):
+        """Number of z-slices per chunk that fits the memory budget."""
+        _, height, width = self.volume.shape
+        return max(1, int(self.memory_budget // (height * width * self.BYTES_PER_VOXEL)))
+
+    def _chunks(self):
+        depth = self.volume.shape[0]
+        step = self._chunk_depth()
+        return [(z0, min(z0 + step, depth)) for z0 in range(0, depth, step)]
+
+    def _border_pairs(self, upper, lower):
+        """
+        Return (label_a, label_b) pairs of objects that touch across two adjacent z-slices.
+        upper is the last slice of one chunk and lower the first slice of the next.
+        """
+        height, width = upper.shape
+        if self.connectivity == 6:
+            shifts = [(0, 0)]
+        elif self.connectivity == 18:
+            shifts = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+        else:
+            shifts = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+        pairs = []
+        for dy, dx in shifts:
+            a = upper[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+            b = lower[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+            touching = (a > 0) & (b > 0)
+            pairs.append(np.stack([a[touching], b[touching]], axis=1))
+        pairs = np.concatenate(pairs)
+        if len(pairs) == 0:
+            return pairs
+        return np.unique(pairs, axis=0)
+
+    def _allocate_labels(self, out, shape):
+        """Resolve out into a label array that respects the memory budget."""
+        if isinstance(out, (str, os.PathLike)):
+            return np.lib.format.open_memmap(out, mode="w+", dtype=np.uint32, shape=shape)
+        if out is not None:
+            return out
+        if np.prod(shape, dtype=np.int64) * np.dtype(np.uint32).itemsize <= self.memory_budget:
+            return np.zeros(shape, dtype=np.uint32)
+        handle, path = tempfile.mkstemp(prefix="labels_", suffix=".npy")
+        os.close(handle)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint32, shape=shape)
+        try:
+            # The mapping stays valid after unlinking, and the file goes away with it.
+            os.remove(path)
+        except OSError:
+            pass
+        return out
+
+    def label(self, threshold=None, invert=False, out=None):
+        """
+        Label connected components chunk by chunk and merge labels across chunk borders.
+        threshold: voxels with values above it are foreground; None treats any
+        non-zero voxel as foreground (e.g. an already segmented mask).
+        invert: label voxels at or below the threshold instead, e.g. pores.
+        out: optional integer array or np.memmap receiving the labels, or a .npy
+        file path to write them to. By default a uint32 array is allocated in
+        memory if it fits the memory budget, and in a temporary memory-mapped
+        file otherwise.
+        Returns (labels, num_labels); labels are numbered 1..num_labels in order of
+        first appearance, 0 is background.
+        """
+        shape = self.volume.shape
+        out = self._allocate_labels(out, shape)
+        max_label = np.iinfo(out.dtype).max
+        rank = 1 if self.connectivity == 6 else (2 if self.connectivity == 18 else 3)
+        structure = ndimage.generate_binary_structure(3, rank)
+
+        # Pass 1: label each chunk independently with globally unique labels.
+        next_label = 0
+        previous_slice = None
+        pairs = []
+        for z0, z1 in self._chunks():
+            chunk = np.asarray(self.volume[z0:z1])
+            mask = chunk > threshold if threshold is not None else chunk != 0
+            if invert:
+                mask = ~mask
+            local, count = ndimage.label(mask, structure=structure)
+            if next_label + count > max_label:
+                raise OverflowError(f"More than {max_label} labels; pass a wider integer `out` array.")
+            local = local.astype(np.int64)
+            local[local > 0] += next_label
+            if previous_slice is not None:
+                pairs.append(self._border_pairs(previous_slice, local[0]))
+            out[z0:z1] = local
+            previous_slice = local[-1].copy()
+            next_label += count
+
+        # Merge labels that touch across chunk borders into one component each.
+        pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+        graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+                           shape=(next_label + 1, next_label + 1))
+        num_components, component = connected_components(graph, directed=False)
+        # Number components by their smallest original label so background stays 0.
+        first = np.full(num_components, next_label + 1, dtype=np.int64)
+        np.minimum.at(first, component, np.arange(next_label + 1))
+        new_id = np.empty(num_components, dtype=out.dtype)
+        new_id[np.argsort(first)] = np.arange(num_components)
+        lut = new_id[component]
+
+        # Pass 2: rewrite chunk labels only if any merge happened.
+        if num_components < next_label + 1:
+            for z0, z1 in self._chunks():
+                out[z0:z1] = lut[np.asarray(out[z0:z1])]
+
+        self.labels = out
+        self.num_labels = num_components - 1
+        self.measurements = None
+        return out, self.num_labels
+
+    @staticmethod
+    def _exposed_faces(lab, before, after, axis, minlength):
+        """
+        Count voxel faces of each label that border a different label or background along axis.
+        before/after are the neighbouring planes just outside lab along axis.
+        """
+        padded = np.concatenate([before, lab, after], axis=axis)
+        length = lab.shape[axis]
+        lower = [slice(None)] * 3
+        upper = [slice(None)] * 3
+        lower[axis] = slice(0, length)
+        upper[axis] = slice(2, length + 2)
+        foreground = lab > 0
+        faces = np.bincount(lab[foreground & (lab != padded[tuple(lower)])], minlength=minlength)
+        faces += np.bincount(lab[foreground & (lab != padded[tuple(upper)])], minlength=minlength)
+        return faces
+
+    def measure(self):
+        """
+        Compute per-label statistics with bincount reductions, chunk by chunk.
+        Returns a dict of NumPy columns (see COLUMNS), one row per label:
+        voxel count, volume, surface area (sum of exposed voxel faces),
+        equivalent sphere diameter and centroid, all in physical units.
+        """
+        if self.labels is None:
+            raise ValueError("No labels available. Call label() first.")
+        labels = self.labels
+        depth, height, width = labels.shape
+        sz, sy, sx = self.spacing
+        n = self.num_labels + 1
+
+        counts = np.zeros(n, dtype=np.int64)
+        sum_z = np.zeros(n)
+        sum_y = np.zeros(n)
+        sum_x = np.zeros(n)
+        faces_z = np.zeros(n, dtype=np.int64)
+        faces_y = np.zeros(n, dtype=np.int64)
+        faces_x = np.zeros(n, dtype=np.int64)
+
+        for z0, z1 in self._chunks():
+            lab = np.asarray(labels[z0:z1]).astype(np.intp)
+            flat = lab.ravel()
+            counts += np.bincount(flat, minlength=n)
+            sum_z += np.bincount(flat, weights=np.repeat(np.arange(z0, z1, dtype=np.float64), height * width), minlength=n)
+            sum_y += np.bincount(flat, weights=np.tile(np.repeat(np.arange(height, dtype=np.float64), width), z1 - z0), minlength=n)
+            sum_x += np.bincount(flat, weights=np.tile(np.arange(width, dtype=np.float64), (z1 - z0) * height), minlength=n)
+
+            # One-slice halo from the neighbouring chunks so faces on chunk borders are exact.
+            zero_slice = np.zeros((1, height, width), dtype=np.intp)
+            before = np.asarray(labels[z0 - 1:z0]).astype(np.intp) if z0 > 0 else zero_slice
+            after = np.asarray(labels[z1:z1 + 1]).astype(np.intp) if z1 < depth else zero_slice
+            faces_z += self._exposed_faces(lab, before, after, 0, n)
+            zero_row = np.zeros((z1 - z0, 1, width), dtype=np.intp)
+            faces_y += self._exposed_faces(lab, zero_row, zero_row, 1, n)
+            zero_column = np.zeros((z1 - z0, height, 1), dtype=np.intp)
+            faces_x += self._exposed_faces(lab, zero_column, zero_column, 2, n)
+
+        counts, sum_z, sum_y, sum_x = counts[1:], sum_z[1:], sum_y[1:], sum_x[1:]
+        safe_counts = np.maximum(counts, 1)
+        volume = counts * (sz * sy * sx)
+        self.measurements = {
+            "label": np.arange(1, n, dtype=np.int64),
+            "voxel_count": counts,
+            "volume": volume,
+            "surface_area": faces_z[1:] * (sy * sx) + faces_y[1:] * (sz * sx) + faces_x[1:] * (sz * sy),
+            "equivalent_diameter": np.cbrt(6.0 * volume / math.pi),
+            "centroid_z": sum_z / safe_counts * sz,
+            "centroid_y": sum_y / safe_counts * sy,
+            "centroid_x": sum_x / safe_counts * sx,
+        }
+        return self.measurements
+
+    def export_csv(self, filename):
+        """Write the per-label measurements to a CSV table, one row per label."""
+        if self.measurements is None:
+            self.measure()
+        table = np.column_stack([self.measurements[name] for name in self.COLUMNS])
+        formats = ["%d", "%d"] + ["%.6g"] * (len(self.COLUMNS) - 2)
+        np.savetxt(filename, table, delimiter=",", fmt=formats,
+                   header=",".join(self.COLUMNS), comments="")
+        return filename
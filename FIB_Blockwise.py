@@ -0,0 +1,149 @@
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+
+import numpy as np
+from scipy import ndimage
+
+
+def _process_block(func, block, crop):
+    """Run func on one haloed block and crop the halo off the result (runs in a worker)."""
+    return np.asarray(func(block))[crop]
+
+
+class BlockProcessor:
+
+    def __init__(self, block_shape=(64, 256, 256), halo=0, workers=None, max_pending=None):
+        """
+        Apply a function to a large volume block by block, with overlapping halos.
+        block_shape: (z, y, x) size of the core of each block.
+        halo: voxels of context read around each block, an int or a (z, y, x) tuple.
+        It must be at least the reach of the function for results to match a
+        whole-array call.
+        workers: number of worker processes; 0 or 1 runs in the calling process.
+        max_pending: blocks in flight at once (default 2 * workers), which bounds
+        peak memory to roughly max_pending haloed blocks plus their results.
+        """
+        self.block_shape = tuple(int(b) for b in block_shape)
+        self.halo = halo
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or 2 * max(1, self.workers)
+
+    @staticmethod
+    def _as_triple(value):
+        if np.isscalar(value):
+            return (int(value),) * 3
+        return tuple(int(v) for v in value)
+
+    def blocks(self, shape, halo=None):
+        """
+        Yield (core, read, crop) slice tuples for every block of a volume of the given shape.
+        core: region of the output the block produces.
+        read: core grown by the halo and clipped to the volume.
+        crop: position of the core inside the read region.
+        """
+        halo = self._as_triple(self.halo if halo is None else halo)
+        starts = [range(0, size, step) for size, step in zip(shape, self.block_shape)]
+        for origin in itertools.product(*starts):
+            core, read, crop = [], [], []
+            for start, step, size, pad in zip(origin, self.block_shape, shape, halo):
+                stop = min(start + step, size)
+                lo = max(start - pad, 0)
+                hi = min(stop + pad, size)
+                core.append(slice(start, stop))
+                read.append(slice(lo, hi))
+                crop.append(slice(start - lo, stop - lo))
+            yield tuple(core), tuple(read), tuple(crop)
+
+    @staticmethod
+    def _allocate(out, shape, dtype):
+        """Resolve out into an array: None allocates in memory, a path creates a .npy memmap."""
+        if out is None:
+            return np.empty(shape, dtype=dtype)
+        if isinstance(out, (str, os.PathLike)):
+            return np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=shape)
+        if tuple(out.shape) != tuple(shape):
+            raise ValueError(f"Output shape {tuple(out.shape)} does not match volume shape {tuple(shape)}.")
+        return out
+
+    def run(self, func, volume, out=None, dtype=None, halo=None):
+        """
+        Apply func to every block of volume and stitch the results.
+        func: callable taking a 3D block and returning an array of the same shape;
+        it must be picklable (module-level function or functools.partial) when
+        workers > 1.
+        volume: any array-like supporting 3D slicing (ndarray, np.memmap, zarr array, ...).
+        out: None, a file path (a .npy memmap is created), or an array-like
+        supporting slice assignment such as a np.memmap or a chunked zarr array.
+        dtype: output dtype (defaults to the volume dtype).
+        Returns the output array.
+        """
+        shape = tuple(volume.shape)
+        out = self._allocate(out, shape, dtype or volume.dtype)
+        blocks = self.blocks(shape, halo)
+
+        if self.workers <= 1:
+            for core, read, crop in blocks:
+                out[core] = _process_block(func, np.asarray(volume[read]), crop)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                pending = {}
+                for core, read, crop in blocks:
+                    # Keep a bounded number of blocks in flight so memory stays flat.
+                    while len(pending) >= self.max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            out[pending.pop(future)] = future.result()
+                    future = pool.submit(_process_block, func, np.asarray(volume[read]), crop)
+                    pending[future] = core
+                for future in list(pending):
+                    out[pending.pop(future)] = future.result()
+
+        if hasattr(out, "flush"):
+            out.flush()
+        return out
+
+
+def gaussian_filter(volume, sigma, out=None, workers=None, block_shape=(64, 256, 256)):
+    """Block-wise 3D Gaussian filter, matching scipy.ndimage.gaussian_filter on the whole array."""
+    sigmas = np.broadcast_to(np.asarray(sigma, dtype=float), (3,))
+    # gaussian_filter truncates its kernel at 4 sigma.
+    halo = tuple(int(4.0 * s + 0.5) for s in sigmas)
+    processor = BlockProcessor(block_shape, halo=halo, workers=workers)
+    return processor.run(partial(ndimage.gaussian_filter, sigma=tuple(sigmas)), volume, out=out)
+
+
+def median_filter(volume, size=3, out=None, workers=None, block_shape=(64, 256, 256)):
+    """Block-wise 3D median filter over a cube of the given size."""
+    processor = BlockProcessor(block_shape, halo=size // 2, workers=workers)
+    return processor.run(partial(ndimage.median_filter, size=size), volume, out=out)
+
+
+MORPHOLOGY_OPERATIONS = {
+    "erosion": (ndimage.grey_erosion, 1),
+    "dilation": (ndimage.grey_dilation, 1),
+    "opening": (ndimage.grey_opening, 2),
+    "closing": (ndimage.grey_closing, 2),
+}
+
+
+def morphology(volume, operation="opening", size=3, out=None, workers=None, block_shape=(64, 256, 256)):
+    """
+    Block-wise grey-scale morphology with a cubic structuring element.
+    operation: "erosion", "dilation", "opening" or "closing"; on binary
+    volumes these equal the corresponding binary operations.
+    """
+    if operation not in MORPHOLOGY_OPERATIONS:
+        raise ValueError(f"Unknown operation {operation!r}; expected one of {sorted(MORPHOLOGY_OPERATIONS)}.")
+    function, passes = MORPHOLOGY_OPERATIONS[operation]
+    # Opening and closing apply two passes, so they reach twice as far.
+    processor = BlockProcessor(block_shape, halo=passes * (size // 2), workers=workers)
+    return processor.run(partial(function, size=size), volume, out=out)
+
+
+FILTERS = {
+    "gaussian": gaussian_filter,
+    "median": median_filter,
+    "morphology": morphology,
+}
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Default composite colours (RGB, 0-1) assigned to channels in order.
+DEFAULT_COLORS = [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0),
+                  (1.0, 1.0, 0.0), (1.0, 0.0, 1.0), (0.0, 1.0, 1.0)]
+
+
+class SliceCache:
+
+    def __init__(self, max_bytes=128 * 1024 ** 2):
+        """
+        LRU cache of 2D slices shared by all channels of a volume.
+        Keys are (channel, axis, index); the cache evicts the least recently
+        used slices once their total size exceeds max_bytes.
+        """
+        self.max_bytes = max_bytes
+        self._slices = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        image = self._slices.get(key)
+        if image is not None:
+            self._slices.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        if key in self._slices:
+            self._bytes -= self._slices.pop(key).nbytes
+        # Cached slices are shared between callers, so they must not be modified.
+        image.setflags(write=False)
+        self._slices[key] = image
+        self._bytes += image.nbytes
+        while self._bytes > self.max_bytes and len(self._slices) > 1:
+            _, old = self._slices.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def clear(self):
+        self._slices.clear()
+        self._bytes = 0
+
+
+def _check_page(page, shape, dtype, where):
+    """Reject a page that does not fit a (channel, depth) + shape array of dtype."""
+    if page.shape != shape:
+        raise ValueError(f"{where} has shape {page.shape}, expected {shape}; "
+                         "co-registered channels must have the same slice size.")
+    if not np.can_cast(page.dtype, dtype, "safe"):
+        raise ValueError(f"{where} has dtype {page.dtype}, which does not fit the "
+                         f"channel dtype {dtype}.")
+
+
+def read_channels(source, n_channels=None):
+    """
+    Read a multi-channel stack in a single pass into a (channel, depth, height, width) array.
+    source: one TIFF whose pages interleave the channels slice by slice
+    (page i belongs to channel i % n_channels), or a list of TIFF files, one per channel.
+    Pages are decoded straight into their final position, so no interleaved
+    intermediate copy of the whole stack is made. All pages must have the same
+    shape; channels with different dtypes are stored in a common dtype that
+    holds every value (e.g. uint8 and uint16 give uint16).
+    """
+    import tifffile as tiff
+
+    if isinstance(source, (list, tuple)):
+        files = [tiff.TiffFile(filename) for filename in source]
+        try:
+            firsts = [f.pages[0] for f in files]
+            shape = firsts[0].shape
+            for name, page in zip(source, firsts):
+                if page.shape != shape:
+                    raise ValueError(f"{name} has slices of shape {page.shape}, expected {shape}; "
+                                     "co-registered channels must have the same slice size.")
+            counts = [len(f.pages) for f in files]
+            if len(set(counts)) > 1:
+                raise ValueError(f"Channel files have different slice counts {counts}; "
+                                 "co-registered channels must have the same depth.")
+            depth = counts[0]
+            dtype = np.result_type(*(page.dtype for page in firsts))
+            channels = np.empty((len(files), depth) + shape, dtype=dtype)
+            for c, (name, tif) in enumerate(zip(source, files)):
+                for z in range(depth):
+                    page = tif.pages[z]
+                    _check_page(page, shape, dtype, f"Page {z} of {name}")
+                    channels[c, z] = page.asarray()
+        finally:
+            for tif in files:
+                tif.close()
+        return channels
+
+    if not n_channels:
+        raise ValueError("n_channels is required for an interleaved single-file stack.")
+    with tiff.TiffFile(source) as tif:
+        if len(tif.pages) % n_channels:
+            raise ValueError(f"{len(tif.pages)} pages cannot be split evenly into {n_channels} channels.")
+        depth = len(tif.pages) // n_channels
+        shape = tif.pages[0].shape
+        # The first slice of every channel decides the common dtype.
+        dtype = np.result_type(*(tif.pages[c].dtype for c in range(n_channels)))
+        channels = np.empty((n_channels, depth) + shape, dtype=dtype)
+        for i in range(depth * n_channels):
+            page = tif.pages[i]
+            _check_page(page, shape, dtype, f"Page {i} of {source}")
+            channels[i % n_channels, i // n_channels] = page.asarray()
+    return channels
+
+
+def composite_rgb(slices, colors, ranges):
+    """
+    Blend 2D channel slices into one RGB uint8 image.
+    Each slice is scaled to 0-1 by its (low, high) range, tinted with its RGB
+    colour and the tinted images are summed and clipped.
+    """
+    rgb = np.zeros(slices[0].shape + (3,), dtype=np.float32)
+    for image, color, (low, high) in zip(slices, colors, ranges):
+        scale = 1.0 / (high - low) if high > low else 0.0
+        intensity = (image.astype(np.float32) - low) * scale
+        rgb += intensity[..., None] * np.asarray(color, dtype=np.float32)
+    return (np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
@@ -0,0 +1,208 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class SlabProjector:
+
+    MODES = ("max", "min", "mean")
+
+    def __init__(self, volume, axis=0, block=8, workers=None, pyramid_bytes=256 * 1024 ** 2):
+        """
+        Compute maximum, minimum and mean intensity projections over slabs of a volume.
+        volume: 3D array with shape (depth, height, width).
+        axis: axis to project along (0 = z/axial, 1 = y/coronal, 2 = x/sagittal).
+        block: number of slices summarised by each leaf of the extremum pyramid.
+        workers: number of threads used for chunked reductions (defaults to the CPU count).
+        pyramid_bytes: memory budget for the extremum pyramid. The block is
+        enlarged as needed to stay within it, and only the pyramid of the mode
+        last used is kept.
+
+        Extremum projections are answered from a pyramid of per-block maxima or
+        minima, so a slab of any width costs O(log(slices) + block) slice
+        operations. Mean projections keep a running sum that is updated with
+        only the slices entering or leaving the slab, so dragging a slab costs
+        time proportional to the change rather than to its width.
+        """
+        if volume.ndim != 3:
+            raise ValueError("SlabProjector expects a 3D volume.")
+        if axis not in (0, 1, 2):
+            raise ValueError("axis must be 0, 1 or 2.")
+        self.volume = volume
+        self.axis = axis
+        self.workers = workers or os.cpu_count() or 1
+        self.length = volume.shape[axis]
+        # A pyramid over n leaves holds at most 2n + log2(n) + 1 slice-sized nodes.
+        slice_bytes = volume.size // self.length * np.dtype(volume.dtype).itemsize
+        nodes = int(pyramid_bytes) // slice_bytes
+        leaves = max(1, (nodes - nodes.bit_length()) // 2)
+        self.block = max(1, int(block), -(-self.length // leaves))
+        self._pyramids = {}
+        self._running_sum = None
+        self._sum_range = (0, 0)
+        self._extremum_state = {}
+
+    def _slab(self, start, stop):
+        """Return the sub-volume between start and stop along the projection axis."""
+        index = [slice(None)] * 3
+        index[self.axis] = slice(start, stop)
+        return self.volume[tuple(index)]
+
+    def _chunks(self, start, stop):
+        """Split [start, stop) into one contiguous chunk per worker."""
+        count = min(self.workers, stop - start)
+        edges = np.linspace(start, stop, count + 1).astype(int)
+        return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    def _reduce(self, mode, start, stop):
+        """Reduce slices [start, stop) in parallel chunks."""
+        if mode == "mean":
+            def reduce_chunk(bounds):
+                return self._slab(*bounds).sum(axis=self.axis, dtype=self._sum_dtype())
+            combine = np.add
+        else:
+            ufunc = np.maximum if mode == "max" else np.minimum
+            def reduce_chunk(bounds):
+                return ufunc.reduce(self._slab(*bounds), axis=self.axis)
+            combine = ufunc
+
+        chunks = self._chunks(start, stop)
+        if len(chunks) == 1:
+            return reduce_chunk(chunks[0])
+        # NumPy reductions release the GIL, so threads use all cores without copying the volume.
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            parts = list(pool.map(reduce_chunk, chunks))
+        return combine.reduce(parts)
+
+    def _sum_dtype(self):
+        """Accumulator type for running sums: exact for integer data."""
+        if np.issubdtype(self.volume.dtype, np.integer):
+            return np.int64
+        return np.float64
+
+    def _pyramid(self, mode):
+        """
+        Build (once) the extremum pyramid for mode.
+        Level 0 holds one projection per block of slices; each further level
+        combines pairs of nodes of the level below. Building the pyramid for
+        one mode frees the pyramid of the other.
+        """
+        if mode in self._pyramids:
+            return self._pyramids[mode]
+        self._pyramids.clear()
+        ufunc = np.maximum if mode == "max" else np.minimum
+        starts = list(range(0, self.length, self.block))
+
+        def reduce_block(start):
+            return ufunc.reduce(self._slab(start, min(start + self.block, self.length)), axis=self.axis)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            level = np.stack(list(pool.map(reduce_block, starts)))
+        levels = [level]
+        while len(level) > 1:
+            pairs = len(level) // 2
+            parent = ufunc(level[0:2 * pairs:2], level[1:2 * pairs:2])
+            if len(level) % 2:
+                parent = np.concatenate([parent, level[-1:]])
+            level = parent
+            levels.append(level)
+        self._pyramids[mode] = levels
+        return levels
+
+    def _pyramid_query(self, mode, start, stop):
+        """Combine pyramid nodes covering slices [start, stop) with block-aligned edges."""
+        ufunc = np.maximum if mode == "max" else np.minimum
+        levels = self._pyramid(mode)
+        first_block = -(-start // self.block)
+        last_block = stop // self.block
+        if first_block >= last_block:
+            return self._reduce(mode, start, stop)
+
+        # Copy the first node taken so callers never alias the pyramid.
+        result = None
+        lo, hi = first_block, last_block
+        for level in levels:
+            if lo >= hi:
+                break
+            if lo % 2:
+                result = level[lo].copy() if result is None else ufunc(result, level[lo])
+                lo += 1
+            if hi % 2:
+                result = level[hi - 1].copy() if result is None else ufunc(result, level[hi - 1])
+                hi -= 1
+            lo //= 2
+            hi //= 2
+        # Partial blocks at either edge of the slab.
+        for a, b in ((start, first_block * self.block), (last_block * self.block, stop)):
+            if b > a:
+                result = ufunc(result, ufunc.reduce(self._slab(a, b), axis=self.axis))
+        return result
+
+    def _extremum(self, mode, start, stop):
+        """
+        Extremum projection, reusing the previous result when the slab only grows.
+        The kept result is private; callers get a copy they are free to modify.
+        """
+        ufunc = np.maximum if mode == "max" else np.minimum
+        previous = self._extremum_state.get(mode)
+        if previous is not None:
+            (p_start, p_stop), image = previous
+            if start <= p_start and stop >= p_stop and (p_start - start) + (stop - p_stop) <= self.block:
+                if start < p_start:
+                    image = ufunc(image, ufunc.reduce(self._slab(start, p_start), axis=self.axis))
+                if stop > p_stop:
+                    image = ufunc(image, ufunc.reduce(self._slab(p_stop, stop), axis=self.axis))
+                self._extremum_state[mode] = ((start, stop), image)
+                return image.copy()
+        image = self._pyramid_query(mode, start, stop)
+        self._extremum_state[mode] = ((start, stop), image)
+        return image.copy()
+
+    def _mean(self, start, stop):
+        """Mean projection from a running sum updated by the slices that entered or left the slab."""
+        p_start, p_stop = self._sum_range
+        overlap = min(stop, p_stop) - max(start, p_start)
+        changed = abs(start - p_start) + abs(stop - p_stop)
+        if self._running_sum is None or overlap <= 0 or changed >= stop - start:
+            total = self._reduce("mean", start, stop)
+        else:
+            total = self._running_sum.copy()
+            # Add slices entering the slab and subtract those leaving it.
+            for a, b, sign in ((start, p_start, 1), (p_start, start, -1),
+                               (p_stop, stop, 1), (stop, p_stop, -1)):
+                if b > a:
+                    part = self._reduce("mean", a, b)
+                    if sign > 0:
+                        total += part
+                    else:
+                        total -= part
+        self._running_sum = total
+        self._sum_range = (start, stop)
+        return total / float(stop - start)
+
+    def project(self, start, stop, mode="max"):
+        """
+        Project slices [start, stop) along the axis.
+        mode: "max" (MIP), "min" (MinIP) or "mean" (average projection).
+        Extremum projections keep the volume dtype; mean projections are float.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown projection mode {mode!r}; expected one of {self.MODES}.")
+        start = int(np.clip(start, 0, self.length))
+        stop = int(np.clip(stop, 0, self.length))
+        if stop <= start:
+            raise ValueError("Slab must contain at least one slice.")
+        if mode == "mean":
+            return self._mean(start, stop)
+        return self._extremum(mode, start, stop)
+
+    def project_slab(self, center, thickness, mode="max"):
+        """
+        Project a slab of `thickness` slices centred on slice `center`.
+        The slab is shifted, not truncated, where it would extend past the volume.
+        """
+        thickness = int(np.clip(thickness, 1, self.length))
+        start = int(center) - thickness // 2
+        start = int(np.clip(start, 0, self.length - thickness))
+        return self.project(start, start + thickness, mode)
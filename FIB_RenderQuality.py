@@ -0,0 +1,146 @@
+import math
+import time
+
+
+class RenderQualityGovernor:
+
+    def __init__(self, render_window, target_frame_time=1.0 / 15.0,
+                 max_sample_distance_factor=8.0, max_image_sample_distance=4.0,
+                 smoothing=0.3, still_update_rate=0.0001):
+        """
+        Adapt volume rendering quality so interactive frames meet a target frame time.
+        render_window: the vtkRenderWindow whose renders are timed.
+        target_frame_time: desired seconds per frame while the user interacts.
+        max_sample_distance_factor: largest multiple of the full-quality ray sample
+        distance used while interacting, for mappers without automatic adjustment.
+        max_image_sample_distance: largest image sample distance (in pixels) used
+        while interacting, for mappers without automatic adjustment that support it.
+        smoothing: weight of the newest frame in the moving-average frame time.
+        still_update_rate: desired update rate (frames per second) when idle; the
+        VTK default is low enough to always render at full quality.
+
+        Volume mappers that adjust their sample distances automatically
+        (vtkSmartVolumeMapper, vtkGPUVolumeRayCastMapper, ...) scale their sampling
+        to the render window's desired update rate. While interacting the governor
+        raises that rate to the target frame rate; VTK then coarsens sampling from
+        its own frame timings. For other mappers every timed frame rescales a
+        quality factor by the ratio of the measured to the target frame time, and
+        the next frame renders with a correspondingly larger ray sample distance.
+        end_interaction() restores full quality and renders once more.
+        """
+        self.render_window = render_window
+        self.target_frame_time = target_frame_time
+        self.max_sample_distance_factor = max_sample_distance_factor
+        self.max_image_sample_distance = max_image_sample_distance
+        self.smoothing = smoothing
+        self.still_update_rate = still_update_rate
+        self.mapper = None
+        self.auto_adjust = False
+        self.full_sample_distance = None
+        self.interactor = None
+        self.interacting = False
+        self.quality_factor = 1.0
+        self.frame_time = 0.0
+        self.fps = 0.0
+        self._listeners = []
+        self._render_start = None
+        render_window.AddObserver("StartEvent", self._on_render_start)
+        render_window.AddObserver("EndEvent", self._on_render_end)
+
+    def set_mapper(self, mapper):
+        """
+        Govern a volume mapper.
+        Mappers with automatic sample distance adjustment keep it enabled and
+        follow the desired update rate. For the others the current sample
+        distance is full quality; an automatic distance (<= 0) is replaced by
+        half the smallest voxel spacing of the mapper input.
+        """
+        self.mapper = mapper
+        self.auto_adjust = hasattr(mapper, "SetAutoAdjustSampleDistances")
+        self.full_sample_distance = None
+        if self.auto_adjust:
+            mapper.SetAutoAdjustSampleDistances(1)
+        elif hasattr(mapper, "GetSampleDistance"):
+            distance = mapper.GetSampleDistance()
+            if distance <= 0:
+                data = mapper.GetInput() if hasattr(mapper, "GetInput") else None
+                spacing = data.GetSpacing() if data is not None else (1.0, 1.0, 1.0)
+                distance = 0.5 * min(spacing)
+            self.full_sample_distance = distance
+        self._apply_quality()
+
+    def attach_interactor(self, interactor):
+        """
+        Lower quality during mouse interaction with the camera and restore it afterwards.
+        The interactor's own update rates are set to match, since interactor
+        styles apply them to the render window when camera interaction starts and ends.
+        """
+        self.interactor = interactor
+        interactor.SetDesiredUpdateRate(1.0 / self.target_frame_time)
+        interactor.SetStillUpdateRate(self.still_update_rate)
+        interactor.AddObserver("StartInteractionEvent", lambda obj, event: self.begin_interaction())
+        interactor.AddObserver("EndInteractionEvent", lambda obj, event: self.end_interaction())
+
+    def add_listener(self, callback):
+        """Register callback(fps, interacting), called after every timed frame."""
+        self._listeners.append(callback)
+
+    def set_target_fps(self, fps):
+        """Set the interactive frame rate the governor aims for."""
+        self.target_frame_time = 1.0 / max(fps, 1e-3)
+        if self.interactor is not None:
+            self.interactor.SetDesiredUpdateRate(1.0 / self.target_frame_time)
+        self._apply_quality()
+
+    def begin_interaction(self):
+        """Switch to interactive rendering; quality adapts from the next frame."""
+        if not self.interacting:
+            self.interacting = True
+            self._apply_quality()
+
+    def end_interaction(self):
+        """Restore full quality and re-render the final frame."""
+        if not self.interacting:
+            return
+        self.interacting = False
+        self.quality_factor = 1.0
+        self._apply_quality()
+        self.render_window.Render()
+
+    def _apply_quality(self):
+        """Push the current quality to the render window and the governed mapper."""
+        if self.interacting:
+            self.render_window.SetDesiredUpdateRate(1.0 / self.target_frame_time)
+        else:
+            self.render_window.SetDesiredUpdateRate(self.still_update_rate)
+        if self.mapper is None or self.auto_adjust:
+            return
+        factor = self.quality_factor if self.interacting else 1.0
+        if self.full_sample_distance is not None:
+            self.mapper.SetSampleDistance(self.full_sample_distance * factor)
+        if hasattr(self.mapper, "SetImageSampleDistance"):
+            # Ray count falls with the square of the image sample distance.
+            self.mapper.SetImageSampleDistance(min(self.max_image_sample_distance, math.sqrt(factor)))
+
+    def _on_render_start(self, obj, event):
+        self._render_start = time.perf_counter()
+
+    def _on_render_end(self, obj, event):
+        if self._render_start is None:
+            return
+        elapsed = time.perf_counter() - self._render_start
+        self._render_start = None
+        if self.frame_time == 0.0:
+            self.frame_time = elapsed
+        else:
+            self.frame_time += self.smoothing * (elapsed - self.frame_time)
+        self.fps = 1.0 / self.frame_time if self.frame_time > 0 else 0.0
+
+        if self.interacting and not self.auto_adjust:
+            # Damped so a single slow frame does not drop quality all at once.
+            ratio = elapsed / self.target_frame_time
+            self.quality_factor = min(self.max_sample_distance_factor,
+                                      max(1.0, self.quality_factor * math.sqrt(ratio)))
+            self._apply_quality()
+        for callback in self._listeners:
+            callback(self.fps, self.interacting)
@@ -0,0 +1,183 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ObliqueReslicer:
+
+    def __init__(self, volume, cache_bytes=256 * 1024 ** 2, chunk_rows=128):
+        """
+        Sample arbitrary planes through a 3D volume with trilinear interpolation.
+        volume: 3D array with shape (depth, height, width), i.e. (z, y, x).
+        cache_bytes: upper bound on the memory used by cached sampling grids.
+        chunk_rows: number of output rows interpolated per vectorized pass,
+        which bounds the size of the temporaries on large planes.
+
+        Plane normals are given in VTK (x, y, z) order and the plane offset is
+        measured in voxels along the normal from the centre of the volume.
+        reslice() may be called from several threads at once; only the grid
+        cache is shared between them.
+        """
+        if volume.ndim != 3:
+            raise ValueError("ObliqueReslicer expects a 3D volume.")
+        self.volume = volume
+        self.shape = volume.shape
+        self.cache_bytes = cache_bytes
+        self.chunk_rows = chunk_rows
+        # Volume centre in (x, y, z) voxel coordinates.
+        self.center = (np.array(self.shape[::-1], dtype=np.float64) - 1) / 2.0
+        self._grid_cache = OrderedDict()
+        self._cached_bytes = 0
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def plane_basis(normal, rotation=0.0):
+        """
+        Return orthonormal (u, v, n) vectors in (x, y, z) order for a plane.
+        u and v span the plane and are rotated by `rotation` degrees about n.
+        """
+        n = np.asarray(normal, dtype=np.float64)
+        length = np.linalg.norm(n)
+        if length == 0:
+            raise ValueError("Plane normal must be non-zero.")
+        n = n / length
+        # Build u from the world axis least aligned with the normal, so the
+        # basis is stable for axis-aligned planes.
+        helper = np.zeros(3)
+        helper[np.argmin(np.abs(n))] = 1.0
+        u = helper - np.dot(helper, n) * n
+        u /= np.linalg.norm(u)
+        v = np.cross(n, u)
+        if rotation:
+            angle = math.radians(rotation)
+            u, v = (math.cos(angle) * u + math.sin(angle) * v,
+                    -math.sin(angle) * u + math.cos(angle) * v)
+        return u, v, n
+
+    def plane_shape(self, step=1.0):
+        """
+        Output (rows, columns) of a resliced plane.
+        The plane spans the volume diagonal so that every orientation covers the whole volume.
+        """
+        extent = math.sqrt(sum(s * s for s in self.shape))
+        samples = max(1, int(math.ceil(extent / step)))
+        return samples, samples
+
+    def _base_grid(self, normal, rotation, step):
+        """
+        Return the cached sampling grid for a plane orientation.
+        The grid holds (z, y, x) sample coordinates of the plane through the
+        volume centre; other offsets are a shift along the normal, so the grid
+        is reused unchanged while only the offset changes.
+        """
+        key = (tuple(np.round(np.asarray(normal, dtype=np.float64), 6)),
+               round(float(rotation), 6), float(step))
+        with self._cache_lock:
+            entry = self._grid_cache.get(key)
+            if entry is not None:
+                self._grid_cache.move_to_end(key)
+                return entry
+
+        u, v, n = self.plane_basis(normal, rotation)
+        rows, cols = self.plane_shape(step)
+        s = (np.arange(cols, dtype=np.float64) - (cols - 1) / 2.0) * step
+        t = (np.arange(rows, dtype=np.float64) - (rows - 1) / 2.0) * step
+        grid = np.empty((3, rows, cols), dtype=np.float32)
+        # Axis 0 of the grid is in array (z, y, x) order, i.e. reversed (x, y, z).
+        for i, axis in enumerate((2, 1, 0)):
+            grid[i] = (self.center[axis]
+                       + t[:, None] * v[axis]
+                       + s[None, :] * u[axis])
+        entry = (grid, u, v, n)
+        if grid.nbytes > self.cache_bytes:
+            # Too large to keep: caching it would evict every other grid and still exceed the bound.
+            return entry
+
+        with self._cache_lock:
+            if key in self._grid_cache:
+                # Another thread built the same grid meanwhile.
+                return self._grid_cache[key]
+            self._grid_cache[key] = entry
+            self._cached_bytes += grid.nbytes
+            while self._cached_bytes > self.cache_bytes:
+                _, (old_grid, _, _, _) = self._grid_cache.popitem(last=False)
+                self._cached_bytes -= old_grid.nbytes
+        return entry
+
+    def clear_cache(self):
+        """Drop all cached sampling grids."""
+        with self._cache_lock:
+            self._grid_cache.clear()
+            self._cached_bytes = 0
+
+    def _trilinear(self, z, y, x, fill):
+        """Vectorized trilinear interpolation of the volume at (z, y, x) sample points."""
+        depth, height, width = self.shape
+        valid = ((z >= 0) & (z <= depth - 1) &
+                 (y >= 0) & (y <= height - 1) &
+                 (x >= 0) & (x <= width - 1))
+
+        z0 = np.clip(np.floor(z), 0, max(depth - 2, 0)).astype(np.intp)
+        y0 = np.clip(np.floor(y), 0, max(height - 2, 0)).astype(np.intp)
+        x0 = np.clip(np.floor(x), 0, max(width - 2, 0)).astype(np.intp)
+        z1 = np.minimum(z0 + 1, depth - 1)
+        y1 = np.minimum(y0 + 1, height - 1)
+        x1 = np.minimum(x0 + 1, width - 1)
+        fz = np.clip(z - z0, 0, 1)
+        fy = np.clip(y - y0, 0, 1)
+        fx = np.clip(x - x0, 0, 1)
+
+        vol = self.volume
+        c00 = vol[z0, y0, x0] * (1 - fx) + vol[z0, y0, x1] * fx
+        c01 = vol[z0, y1, x0] * (1 - fx) + vol[z0, y1, x1] * fx
+        c10 = vol[z1, y0, x0] * (1 - fx) + vol[z1, y0, x1] * fx
+        c11 = vol[z1, y1, x0] * (1 - fx) + vol[z1, y1, x1] * fx
+        c0 = c00 * (1 - fy) + c01 * fy
+        c1 = c10 * (1 - fy) + c11 * fy
+        values = c0 * (1 - fz) + c1 * fz
+        values[~valid] = fill
+        return values
+
+    def reslice(self, normal=(0, 0, 1), offset=0.0, rotation=0.0, step=1.0, fill=0):
+        """
+        Extract an oblique plane as a 2D NumPy array.
+        normal: plane normal in (x, y, z) order.
+        offset: distance in voxels from the volume centre along the normal.
+        rotation: in-plane rotation in degrees.
+        step: sample spacing in voxels; values > 1 give a fast, coarser preview.
+        fill: value used for samples outside the volume.
+        The result has the dtype of the volume (integer data is rounded).
+        """
+        grid, _, _, n = self._base_grid(normal, rotation, step)
+        shift = offset * n[::-1]  # (z, y, x) shift of the plane
+        rows = grid.shape[1]
+        out = np.empty(grid.shape[1:], dtype=self.volume.dtype)
+        is_integer = np.issubdtype(out.dtype, np.integer)
+        if is_integer:
+            info = np.iinfo(out.dtype)
+
+        for r0 in range(0, rows, self.chunk_rows):
+            r1 = min(r0 + self.chunk_rows, rows)
+            values = self._trilinear(grid[0, r0:r1] + shift[0],
+                                     grid[1, r0:r1] + shift[1],
+                                     grid[2, r0:r1] + shift[2],
+                                     fill)
+            if is_integer:
+                values = np.clip(np.rint(values), info.min, info.max)
+            out[r0:r1] = values
+        return out
+
+    def plane_geometry(self, normal=(0, 0, 1), offset=0.0, rotation=0.0, step=1.0):
+        """
+        Return (origin, u, v, n) placing a resliced plane in (x, y, z) voxel space.
+        origin is the position of output pixel (0, 0); columns advance along
+        u * step and rows along v * step.
+        """
+        _, u, v, n = self._base_grid(normal, rotation, step)
+        rows, cols = self.plane_shape(step)
+        origin = (self.center + offset * n
+                  - (cols - 1) / 2.0 * step * u
+                  - (rows - 1) / 2.0 * step * v)
+        return origin, u, v, n
@@ -0,0 +1,510 @@
+import argparse
+import json
+import operator
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import numpy as np
+
+from FIB_Reslice import ObliqueReslicer
+from FIB_Tomo import FIBTomo
+
+NPY_CONTENT_TYPE = "application/x-npy"
+
+
+def encode_array(array):
+    """Serialize an array in .npy format, which is self-describing and cheap to decode."""
+    buffer = BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_array(data):
+    return np.load(BytesIO(data), allow_pickle=False)
+
+
+def parse_range(text, size):
+    """Parse "start:stop:step" (any part may be empty) into a slice within size."""
+    parts = (text.split(":") + ["", ""])[:3]
+    start, stop, step = (int(p) if p else None for p in parts)
+    if step is not None and step < 1:
+        raise ValueError("Range step must be positive.")
+    return slice(*slice(start, stop, step).indices(size))
+
+
+def _int_param(query, name, default=None, minimum=None):
+    """Read an integer query parameter; ValueError if it is missing (without default) or invalid."""
+    text = query.get(name)
+    if text is None:
+        if default is None:
+            raise ValueError(f"Missing query parameter {name!r}.")
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise ValueError(f"Query parameter {name!r} must be an integer, got {text!r}.") from None
+    if minimum is not None and value < minimum:
+        raise ValueError(f"Query parameter {name!r} must be at least {minimum}.")
+    return value
+
+
+def _float_param(query, name, default, positive=False):
+    """Read a finite float query parameter; ValueError if it is invalid."""
+    text = query.get(name)
+    if text is None:
+        return default
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"Query parameter {name!r} must be a number, got {text!r}.") from None
+    if not np.isfinite(value) or (positive and value <= 0):
+        raise ValueError(f"Query parameter {name!r} must be a finite{' positive' if positive else ''} number.")
+    return value
+
+
+class ResponseCache:
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        """Thread-safe LRU cache of encoded responses, bounded by total size."""
+        self.max_bytes = max_bytes
+        self._responses = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._responses.get(key)
+            if body is not None:
+                self._responses.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._responses:
+                self._bytes -= len(self._responses.pop(key))
+            self._responses[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, old = self._responses.popitem(last=False)
+                self._bytes -= len(old)
+
+
+class _SliceHTTPServer(ThreadingHTTPServer):
+    # Each connection gets its own daemon thread, so idle keep-alive clients
+    # neither block other viewers nor keep the process alive; the work itself
+    # runs on the SliceServer's bounded compute pool.
+    daemon_threads = True
+
+
+class _SliceRequestHandler(BaseHTTPRequestHandler):
+    # Persistent connections let a viewer stream many slices over one socket.
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Connections idle for longer than this are closed.
+        self.timeout = self.server.slice_server.idle_timeout
+        super().setup()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path not in SliceServer.ROUTES:
+            self.send_error(404, f"Unknown endpoint {url.path}")
+            return
+        try:
+            body, content_type = self.server.slice_server.handle(url.path, dict(parse_qsl(url.query)))
+        except (ValueError, IndexError) as error:
+            self.send_error(400, str(error))
+            return
+        except Exception as error:
+            self.send_error(500, f"{type(error).__name__}: {error}")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Slice traffic is too chatty for the console.
+        pass
+
+
+class SliceServer:
+
+    ROUTES = ("/info", "/range", "/slice", "/tile", "/roi", "/oblique")
+
+    def __init__(self, tomo, host="127.0.0.1", port=8765, workers=8, cache_bytes=256 * 1024 ** 2,
+                 idle_timeout=30.0, max_roi_bytes=128 * 1024 ** 2):
+        """
+        Serve slices of one loaded FIBTomo volume to many local viewers over HTTP.
+        tomo: a loaded FIBTomo (ideally memory-mapped, see load_image(mmap=True)).
+        port: TCP port; 0 picks a free one (see url).
+        workers: number of requests computed at once; connections themselves are
+        handled by lightweight per-connection threads.
+        cache_bytes: size of the LRU cache of encoded responses.
+        idle_timeout: seconds after which an idle keep-alive connection is closed.
+        max_roi_bytes: largest /roi response; RemoteVolume splits bigger reads.
+        /oblique requests whose sampling grid and plane together exceed it are
+        rejected as well, so a small step cannot exhaust the server's memory.
+
+        Identical requests that arrive while one is being computed are
+        coalesced: they wait for the first one and share its response.
+        """
+        if not tomo.loaded:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        self.tomo = tomo
+        self.cache = ResponseCache(cache_bytes)
+        self.idle_timeout = idle_timeout
+        self.max_roi_bytes = max_roi_bytes
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._reslicers = {}
+        self._reslicer_lock = threading.Lock()
+        self._range_lock = threading.Lock()
+        self._httpd = _SliceHTTPServer((host, port), _SliceRequestHandler)
+        self._httpd.slice_server = self
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, filename, n_channels=None, names=None, **kwargs):
+        """Load a stack once (memory-mapped where possible) and create a server for it."""
+        tomo = FIBTomo()
+        if n_channels or isinstance(filename, (list, tuple)):
+            tomo.load_channels(filename, names, n_channels)
+        else:
+            tomo.load_image(filename, mmap=True)
+        return cls(tomo, **kwargs)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self):
+        """Serve from a background thread and return the server URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._pool.shutdown()
+
+    def handle(self, path, query):
+        """
+        Return (body, content_type) for a request, using the response cache and
+        coalescing concurrent identical requests.
+        """
+        if path not in self.ROUTES:
+            raise ValueError(f"Unknown endpoint {path}")
+        key = (path, tuple(sorted(query.items())))
+        body = self.cache.get(key)
+        if body is not None:
+            return body, self._content_type(path)
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                # The previous owner may have cached its result since the check above.
+                body = self.cache.get(key)
+                if body is not None:
+                    return body, self._content_type(path)
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result(), self._content_type(path)
+
+        try:
+            body = self._pool.submit(self._compute, path, query).result()
+            self.cache.put(key, body)
+            future.set_result(body)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return body, self._content_type(path)
+
+    @staticmethod
+    def _content_type(path):
+        return "application/json" if path in ("/info", "/range") else NPY_CONTENT_TYPE
+
+    def _channel(self, query):
+        """Resolve the channel query parameter (name or index) to an index."""
+        channel = query.get("channel")
+        if channel is None:
+            return 0
+        if channel in self.tomo.channel_names:
+            return self.tomo.channel_names.index(channel)
+        index = _int_param(query, "channel")
+        if not 0 <= index < len(self.tomo.channel_names):
+            raise ValueError(f"Unknown channel {channel!r}")
+        return index
+
+    def _compute(self, path, query):
+        channel = self._channel(query)
+        volume = self.tomo.channels[channel]
+        depth, height, width = volume.shape
+
+        if path == "/info":
+            info = {"shape": [depth, height, width],
+                    "dtype": np.dtype(volume.dtype).str,
+                    "channels": self.tomo.channel_names,
+                    "max_roi_bytes": self.max_roi_bytes}
+            return json.dumps(info).encode()
+
+        if path == "/range":
+            with self._range_lock:
+                low, high = self.tomo.channel_range(channel)
+            return json.dumps({"min": low, "max": high}).encode()
+
+        if path == "/roi":
+            try:
+                selection = tuple(parse_range(query.get(name, ""), size)
+                                  for name, size in zip("zyx", volume.shape))
+            except ValueError:
+                raise ValueError("Ranges must be given as start:stop:step with a positive step.") from None
+            nbytes = np.prod([len(range(*s.indices(size))) for s, size in zip(selection, volume.shape)],
+                             dtype=np.int64) * np.dtype(volume.dtype).itemsize
+            if nbytes > self.max_roi_bytes:
+                raise ValueError(f"Region of {nbytes} bytes exceeds the limit of {self.max_roi_bytes} "
+                                 "bytes; request it in parts.")
+            return encode_array(volume[selection])
+
+        if path == "/oblique":
+            try:
+                normal = tuple(float(v) for v in query.get("normal", "0,0,1").split(","))
+            except ValueError:
+                raise ValueError("normal must be three comma-separated numbers.") from None
+            if len(normal) != 3 or not np.all(np.isfinite(normal)):
+                raise ValueError("normal must be three comma-separated numbers.")
+            reslicer = self._reslicer(channel)
+            step = _float_param(query, "step", 1.0, positive=True)
+            rows, cols = reslicer.plane_shape(step)
+            # float32 (z, y, x) sampling grid plus the resliced plane itself.
+            nbytes = rows * cols * (3 * 4 + np.dtype(volume.dtype).itemsize)
+            if nbytes > self.max_roi_bytes:
+                raise ValueError(f"Oblique plane of {rows}x{cols} samples needs {nbytes} bytes, more than the "
+                                 f"limit of {self.max_roi_bytes} bytes; use a larger step.")
+            plane = reslicer.reslice(normal,
+                                     _float_param(query, "offset", 0.0),
+                                     _float_param(query, "rotation", 0.0),
+                                     step)
+            return encode_array(plane)
+
+        axis = _int_param(query, "axis", 0)
+        if axis not in (0, 1, 2):
+            raise ValueError("axis must be 0, 1 or 2.")
+        index = _int_param(query, "index")
+        if not 0 <= index < volume.shape[axis]:
+            raise IndexError(f"Slice index {index} out of range for axis {axis}.")
+        rows, columns = [size for a, size in enumerate(volume.shape) if a != axis]
+
+        if path == "/slice":
+            step = _int_param(query, "step", 1, minimum=1)
+            region = (slice(None, None, step), slice(None, None, step))
+        else:  # /tile
+            # Level L halves the resolution L times; tiles are size x size pixels at that level.
+            factor = 2 ** _int_param(query, "level", 0, minimum=0)
+            size = _int_param(query, "size", 256, minimum=1)
+            row = _int_param(query, "row", 0, minimum=0)
+            column = _int_param(query, "col", 0, minimum=0)
+            region = (slice(row * size * factor, min((row + 1) * size * factor, rows), factor),
+                      slice(column * size * factor, min((column + 1) * size * factor, columns), factor))
+        selection = list(region)
+        selection.insert(axis, index)
+        # Only the requested region is read, so memory-mapped volumes stay on disk.
+        return encode_array(volume[tuple(selection)])
+
+    def _reslicer(self, channel):
+        # Reslicers are thread-safe, so planes of one channel are sampled concurrently.
+        with self._reslicer_lock:
+            if channel not in self._reslicers:
+                self._reslicers[channel] = ObliqueReslicer(self.tomo.channels[channel])
+            return self._reslicers[channel]
+
+
+class RemoteVolume:
+
+    ndim = 3
+
+    def __init__(self, url, channel=None, timeout=60):
+        """
+        Array-like view of one channel of a volume held by a SliceServer.
+        Supports basic indexing (integers and slices with steps); every access
+        fetches just the requested region from the server, split into several
+        requests when it exceeds the server's region size limit.
+        Each thread keeps its own persistent connection to the server.
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        parsed = urlparse(self.url)
+        self._connection_class = HTTPSConnection if parsed.scheme == "https" else HTTPConnection
+        self._netloc = parsed.netloc
+        self._base_path = parsed.path
+        self._local = threading.local()
+        info = json.loads(self._fetch("/info"))
+        self.shape = tuple(info["shape"])
+        self.dtype = np.dtype(info["dtype"])
+        self.channel_names = info["channels"]
+        self.max_roi_bytes = info["max_roi_bytes"]
+        self.channel = channel if channel is not None else self.channel_names[0]
+        self._range = None
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connection_class(self._netloc, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _fetch(self, path, **params):
+        query = urlencode({k: v for k, v in params.items() if v is not None})
+        target = f"{self._base_path}{path}?{query}"
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("GET", target)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (ConnectionError, HTTPException):
+                # The server closes idle keep-alive connections; reconnect once.
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ValueError(f"Slice server error {response.status} for {path}: {response.reason}")
+        return body
+
+    def _fetch_array(self, path, **params):
+        return decode_array(self._fetch(path, channel=self.channel, **params))
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (3 - len(key) + 1) + key[i + 1:]
+        if len(key) > 3:
+            raise IndexError("Too many indices for a 3D volume.")
+        key = key + (slice(None),) * (3 - len(key))
+
+        bounds, squeeze = [], []
+        for axis, (k, size) in enumerate(zip(key, self.shape)):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(size)
+                if step < 1:
+                    raise IndexError("Negative steps are not supported on remote volumes.")
+            else:
+                start = operator.index(k)
+                if start < 0:
+                    start += size
+                if not 0 <= start < size:
+                    raise IndexError(f"Index {k} out of range for axis {axis} with size {size}.")
+                stop, step = start + 1, 1
+                squeeze.append(axis)
+            bounds.append((start, stop, step))
+        data = self._fetch_region(bounds)
+        return data.squeeze(axis=tuple(squeeze)) if squeeze else data
+
+    def _fetch_region(self, bounds):
+        """
+        Fetch the region given by (start, stop, step) per axis. Regions larger than
+        the server limit are split along the first axis with more than one index.
+        """
+        counts = [len(range(*b)) for b in bounds]
+        nbytes = int(np.prod(counts, dtype=np.int64)) * self.dtype.itemsize
+        if nbytes <= self.max_roi_bytes or max(counts) <= 1:
+            return self._fetch_array("/roi", **{name: "%d:%d:%d" % b for name, b in zip("zyx", bounds)})
+        out = np.empty(counts, dtype=self.dtype)
+        axis = next(a for a, count in enumerate(counts) if count > 1)
+        start, stop, step = bounds[axis]
+        per_piece = max(1, self.max_roi_bytes // (nbytes // counts[axis]))
+        index = [slice(None)] * 3
+        for i in range(0, counts[axis], per_piece):
+            piece = list(bounds)
+            piece[axis] = (start + i * step, min(start + (i + per_piece) * step, stop), step)
+            index[axis] = slice(i, i + per_piece)
+            out[tuple(index)] = self._fetch_region(piece)
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:, :, :]
+        return data.astype(dtype) if dtype is not None else data
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _value_range(self):
+        if self._range is None:
+            self._range = json.loads(self._fetch("/range", channel=self.channel))
+        return self._range
+
+    def min(self):
+        return self.dtype.type(self._value_range()["min"])
+
+    def max(self):
+        return self.dtype.type(self._value_range()["max"])
+
+    def slice(self, axis, index, step=1):
+        """Fetch an axis-aligned slice, optionally downsampled by step."""
+        return self._fetch_array("/slice", axis=axis, index=index, step=step)
+
+    def tile(self, axis, index, level=0, row=0, col=0, size=256):
+        """Fetch one size x size tile of a slice downsampled by 2**level."""
+        return self._fetch_array("/tile", axis=axis, index=index, level=level, row=row, col=col, size=size)
+
+    def oblique(self, normal=(0, 0, 1), offset=0.0, rotation=0.0, step=1.0):
+        """Fetch an oblique plane resliced by the server (see ObliqueReslicer.reslice)."""
+        return self._fetch_array("/oblique", normal=",".join(str(float(v)) for v in normal),
+                                 offset=offset, rotation=rotation, step=step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve slices of one FIB-SEM volume to local viewers.")
+    parser.add_argument("files", nargs="+", help="TIFF/.npy stack, or one TIFF per channel")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--channels", type=int, default=None,
+                        help="number of channels interleaved page by page in a single TIFF")
+    parser.add_argument("--names", default=None, help="comma-separated channel names, e.g. SE,BSE")
+    args = parser.parse_args()
+
+    names = args.names.split(",") if args.names else None
+    source = args.files if len(args.files) > 1 else args.files[0]
+    server = SliceServer.from_file(source, n_channels=args.channels, names=names,
+                                   host=args.host, port=args.port, workers=args.workers)
+    print(f"Serving {server.tomo.volume.shape} volume at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _nearest_zero_1d(mask, spacing):
+    """
+    Squared distance along the last axis from each voxel to the nearest False voxel.
+    Lines without any False voxel get infinity.
+    """
+    n = mask.shape[-1]
+    index = np.arange(n, dtype=np.float64)
+    background = np.where(mask, np.nan, index)
+    # Index of the closest background voxel at or before / at or after each position.
+    before = np.fmax.accumulate(np.where(np.isnan(background), -np.inf, background), axis=-1)
+    after = np.fmin.accumulate(np.where(np.isnan(background), np.inf, background)[..., ::-1], axis=-1)[..., ::-1]
+    distance = np.minimum(index - before, after - index) * spacing
+    return distance * distance
+
+
+def _lower_envelope(g, spacing):
+    """
+    Felzenszwalb-Huttenlocher lower envelope of parabolas along the last axis:
+    f(q) = min_p (spacing * (q - p))^2 + g(p), in linear time per line.
+    The scan runs over positions and is vectorized across all lines at once;
+    infinite entries of g contribute no parabola.
+    """
+    lines, n = g.shape
+    position = np.arange(n, dtype=np.float64) * spacing
+    vertex = np.zeros((lines, n), dtype=np.intp)
+    bound = np.empty((lines, n + 1), dtype=np.float64)
+    top = np.full(lines, -1, dtype=np.intp)
+
+    for q in range(n):
+        gq = g[:, q]
+        finite = np.isfinite(gq)
+        first = finite & (top < 0)
+        if first.any():
+            vertex[first, 0] = q
+            bound[first, 0] = -np.inf
+            bound[first, 1] = np.inf
+            top[first] = 0
+        active = np.nonzero(finite & ~first)[0]
+        while active.size:
+            k = top[active]
+            p = vertex[active, k]
+            s = ((gq[active] + position[q] ** 2) - (g[active, p] + position[p] ** 2)) / (2.0 * (position[q] - position[p]))
+            pop = s <= bound[active, k]
+            keep = active[~pop]
+            if keep.size:
+                k_keep = top[keep] + 1
+                vertex[keep, k_keep] = q
+                bound[keep, k_keep] = s[~pop]
+                bound[keep, k_keep + 1] = np.inf
+                top[keep] = k_keep
+            active = active[pop]
+            top[active] -= 1
+
+    result = np.full((lines, n), np.inf)
+    started = np.nonzero(top >= 0)[0]
+    k = np.zeros(lines, dtype=np.intp)
+    for q in range(n):
+        advance = started[bound[started, k[started] + 1] < position[q]]
+        while advance.size:
+            k[advance] += 1
+            advance = advance[bound[advance, k[advance] + 1] < position[q]]
+        p = vertex[started, k[started]]
+        result[started, q] = (position[q] - position[p]) ** 2 + g[started, p]
+    return result
+
+
+def _chunk_bounds(size, chunk):
+    return [(start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+
+def distance_transform(mask, spacing=(1.0, 1.0, 1.0), workers=None, chunk=32, squared=False):
+    """
+    Exact 3D Euclidean distance from every True voxel to the nearest False voxel.
+    mask: 3D boolean array (depth, height, width); False voxels get distance 0.
+    spacing: voxel size along (z, y, x), so anisotropic voxels give physical distances.
+    workers: threads used to process chunks (defaults to the CPU count).
+    chunk: number of planes per chunk, perpendicular to the axis being processed.
+    squared: return squared distances instead of distances.
+
+    The transform is separable: one pass per axis, each linear in the line
+    length. Every pass processes complete lines along its axis, so chunks are
+    cut across the other axes and chunk borders need no special treatment.
+    Returns a float32 array; voxels with no False voxel anywhere get infinity.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    depth, height, width = mask.shape
+    sz, sy, sx = (float(s) for s in spacing)
+    workers = workers or os.cpu_count() or 1
+    result = np.empty(mask.shape, dtype=np.float32)
+
+    # Pass along z: chunks over y, each holding complete z-lines.
+    def z_pass(bounds):
+        y0, y1 = bounds
+        block = np.moveaxis(mask[:, y0:y1, :], 0, -1)  # (y, x, z)
+        result[:, y0:y1, :] = np.moveaxis(_nearest_zero_1d(block, sz), -1, 0)
+
+    # Passes along y and x: chunks over z, each holding complete y- and x-lines.
+    def yx_pass(bounds):
+        z0, z1 = bounds
+        g = np.moveaxis(result[z0:z1].astype(np.float64), 1, -1)  # (z, x, y)
+        g = _lower_envelope(g.reshape(-1, height), sy).reshape(z1 - z0, width, height)
+        g = np.moveaxis(g, -1, 1)  # (z, y, x)
+        g = _lower_envelope(g.reshape(-1, width), sx).reshape(z1 - z0, height, width)
+        result[z0:z1] = g
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(z_pass, _chunk_bounds(height, chunk)))
+        list(pool.map(yx_pass, _chunk_bounds(depth, chunk)))
+    if not squared:
+        np.sqrt(result, out=result)
+    return result
+
+
+def _ball_offsets(radius, spacing):
+    """Integer (z, y, x) offsets of the voxels strictly within radius of the origin."""
+    reach = [int(np.ceil(radius / s)) for s in spacing]
+    grid = np.mgrid[-reach[0]:reach[0] + 1, -reach[1]:reach[1] + 1, -reach[2]:reach[2] + 1]
+    squared = sum((axis * s) ** 2 for axis, s in zip(grid, spacing))
+    return grid[:, squared < radius * radius].T
+
+
+def _ridge(radius_map, spacing):
+    """
+    Drop sphere centres whose sphere lies inside the sphere of a neighbour:
+    a centre is redundant when a neighbour's radius exceeds its own by at
+    least their distance. Returns the mask of the remaining centres.
+    """
+    depth, height, width = radius_map.shape
+    padded = np.pad(radius_map, 1)
+    ridge = radius_map > 0
+    for dz, dy, dx in np.ndindex(3, 3, 3):
+        if (dz, dy, dx) == (1, 1, 1):
+            continue
+        step = np.sqrt(((dz - 1) * spacing[0]) ** 2 + ((dy - 1) * spacing[1]) ** 2 + ((dx - 1) * spacing[2]) ** 2)
+        neighbour = padded[dz:dz + depth, dy:dy + height, dx:dx + width]
+        ridge &= neighbour < radius_map + step
+    return ridge
+
+
+def _paint_spheres(volume, centres, offsets, value, batch):
+    """
+    Set every voxel of the spheres around centres to value in a C-contiguous 3D volume.
+    Spheres that cross the volume border are clipped; the others are painted
+    with plain flat indices.
+    """
+    shape = np.array(volume.shape)
+    strides = np.array([shape[1] * shape[2], shape[2], 1])
+    flat = volume.reshape(-1)
+    reach = np.abs(offsets).max(axis=0)
+    interior = np.all((centres >= reach) & (centres < shape - reach), axis=1)
+    step = max(1, batch // len(offsets))
+    inner, flat_offsets = centres[interior] @ strides, offsets @ strides
+    for start in range(0, len(inner), step):
+        flat[(inner[start:start + step, None] + flat_offsets[None]).ravel()] = value
+    border = centres[~interior]
+    for start in range(0, len(border), step):
+        voxels = (border[start:start + step, None, :] + offsets[None]).reshape(-1, 3)
+        voxels = voxels[np.all((voxels >= 0) & (voxels < shape), axis=1)]
+        flat[voxels @ strides] = value
+
+
+# Painting spheres costs far less per voxel than a distance transform pass.
+_EDT_COST_PER_VOXEL = 50
+
+
+def local_thickness(mask, spacing=(1.0, 1.0, 1.0), sizes=25, workers=None, chunk=32, batch=1 << 22):
+    """
+    Local thickness map: the diameter of the largest sphere that fits inside the
+    True phase and contains each voxel (Hildebrand & Ruegsegger).
+    mask: 3D boolean array of the phase to measure, e.g. pores or solid.
+    spacing: voxel size along (z, y, x).
+    sizes: number of sphere radii to test (evenly spaced up to the largest
+    inscribed radius), or an explicit sequence of radii in physical units.
+    batch: number of voxel coordinates painted at once, which bounds temporaries.
+    Returns a float32 map in physical units, 0 outside the phase.
+
+    Every voxel is a sphere centre whose radius is its distance to the boundary,
+    rounded down to a tested radius. Only centres whose sphere is not inside a
+    neighbour's sphere are kept. The spheres of each radius are then either
+    painted from a stencil or, when there are many, found with one distance
+    transform over the bounding box of their centres, whichever is cheaper.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    spacing = tuple(float(s) for s in spacing)
+    distance = distance_transform(mask, spacing, workers=workers, chunk=chunk)
+    thickness = np.zeros(mask.shape, dtype=np.float32)
+    largest = float(distance[mask].max()) if mask.any() else 0.0
+    if not np.isfinite(largest) or largest <= 0:
+        return thickness
+    if np.isscalar(sizes):
+        radii = np.linspace(0, largest, int(sizes) + 1)[1:]
+    else:
+        radii = np.sort(np.asarray(sizes, dtype=np.float64))
+    radii = radii[radii > 0]
+    if radii.size == 0:
+        return thickness
+
+    # Index of the largest tested radius not exceeding each voxel's distance, -1 for none.
+    level = np.searchsorted(radii, distance, side="right").astype(np.int32) - 1
+    del distance
+    radius_map = np.where(level >= 0, radii[np.maximum(level, 0)], 0.0).astype(np.float32)
+    ridge = _ridge(radius_map, spacing)
+    del radius_map
+    centres = np.nonzero(ridge)
+    centre_level = level[centres]
+    centres = np.stack(centres, axis=1)
+    del ridge, level
+    order = np.argsort(centre_level, kind="stable")
+    centres, centre_level = centres[order], centre_level[order]
+    bounds = np.searchsorted(centre_level, np.arange(len(radii) + 1))
+    shape = np.array(mask.shape)
+
+    # Ascending radii: larger spheres overwrite smaller ones where they overlap.
+    for index, radius in enumerate(radii):
+        points = centres[bounds[index]:bounds[index + 1]]
+        if len(points) == 0:
+            continue
+        offsets = _ball_offsets(radius, spacing)
+        reach = offsets.max(axis=0)
+        low = np.maximum(points.min(axis=0) - reach, 0)
+        high = np.minimum(points.max(axis=0) + reach + 1, shape)
+        box = tuple(slice(a, b) for a, b in zip(low, high))
+        if len(points) * len(offsets) <= _EDT_COST_PER_VOXEL * np.prod(high - low):
+            _paint_spheres(thickness, points, offsets, 2.0 * radius, batch)
+        else:
+            not_centre = np.ones(tuple(high - low), dtype=bool)
+            local = points - low
+            not_centre[local[:, 0], local[:, 1], local[:, 2]] = False
+            to_centre = distance_transform(not_centre, spacing, workers=workers, chunk=chunk, squared=True)
+            thickness[box][to_centre < radius * radius] = 2.0 * radius
+    thickness[~mask] = 0.0
+    return thickness
+
+
+def size_distribution(thickness, bins=25, spacing=(1.0, 1.0, 1.0)):
+    """
+    Volume-weighted size distribution of a local thickness map.
+    Returns (bin_edges, volume_fraction), where volume_fraction[i] is the
+    fraction of the phase volume whose local thickness lies in bin i.
+    """
+    values = thickness[thickness > 0]
+    if values.size == 0:
+        return np.linspace(0, 1, bins + 1), np.zeros(bins)
+    voxel_volume = float(np.prod(spacing))
+    counts, edges = np.histogram(values, bins=bins, range=(0, float(values.max())))
+    volume = counts * voxel_volume
+    return edges, volume / volume.sum()
@@ -1,10 +1,11 @@
-import vtk
+# Only NumPy is imported at module load so that loading, slicing, statistics and
+# export stay fast to import. VTK, OpenCV and tifffile are imported inside the
+# methods that need them.
 import numpy as np
-import tifffile as tiff
-import cv2
-import os
-import vtkmodules.util.numpy_support as numpy_support
-from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor
+from FIB_Channels import DEFAULT_COLORS, SliceCache, composite_rgb, read_channels
+from FIB_Projection import SlabProjector
+from FIB_Reslice import ObliqueReslicer
+from FIB_Thickness import local_thickness, size_distribution
 
 class FIBTomo:
     
@@ -17,6 +18,23 @@ class FIBTomo:
         self.dims = dims
         self.volume = None
         self.loaded = False
+        # Multi-channel data: a (channel, depth, height, width) array with one
+        # contiguous volume per channel; self.volume is a view of the active one.
+        self.channels = None
+        self.channel_names = []
+        self.channel_colors = []
+        self.active_channel = 0
+        self._channel_views = []
+        self._channel_ranges = {}
+        # Slice, reslice and projection caches are kept per channel, so switching
+        # channels never reloads or recomputes anything already seen.
+        self.slice_cache = SliceCache()
+        self._reslicers = {}
+        self._projectors = {}
+        # Memory budget shared by the projection pyramids of the three axes.
+        self.projection_bytes = 256 * 1024 ** 2
+        self.thickness = None
+        self.thickness_spacing = (1.0, 1.0, 1.0)
         # Default slice indices for each axis (centered)
         self.x_offset = dims[2] // 2
         self.y_offset = dims[1] // 2
@@ -30,10 +48,13 @@ class FIBTomo:
         self.y_offset = y
         self.z_offset = z
     
-    def load_image(self, filename=None):
+    def load_image(self, filename=None, mmap=False):
         """
         Load a TIFF stack as a 3D NumPy array from the specified file path.
         If no filename is provided, synthetic volume data is generated.
+        With mmap=True the stack is memory-mapped instead of read into memory;
+        this works for .npy files and uncompressed, contiguous TIFF stacks, and
+        falls back to a normal read for other TIFFs.
         """
         if filename is None:
             # Generate synthetic volume data with a horizontal gradient.
@@ -41,21 +62,217 @@ class FIBTomo:
             for z in range(self.dims[0]):
                 for y in range(self.dims[1]):
                     self.volume[z, y, :] = np.linspace(0, 255, self.dims[2], dtype=np.uint8)
+        elif mmap and str(filename).lower().endswith(".npy"):
+            self.volume = np.load(filename, mmap_mode="r")
         else:
             # Load the TIFF stack from the given filename.
-            self.volume = tiff.TiffFile(filename).asarray(key=slice(None))
+            import tifffile as tiff
+            if mmap:
+                try:
+                    self.volume = tiff.memmap(filename, mode="r")
+                except ValueError:
+                    # Compressed or fragmented stacks cannot be memory-mapped.
+                    self.volume = tiff.TiffFile(filename).asarray(key=slice(None))
+            else:
+                self.volume = tiff.TiffFile(filename).asarray(key=slice(None))
+        self._set_channels(self.volume[np.newaxis], ["Intensity"])
+        # Reset offsets to the center of the loaded volume.
+        self.dims = self.volume.shape
+        depth, height, width = self.dims
+        self.x_offset = width // 2
+        self.y_offset = height // 2
+        self.z_offset = depth // 2
+        return self.volume
+
+    def load_channels(self, source, names=None, n_channels=None, colors=None):
+        """
+        Load co-registered detector channels (e.g. SE, BSE, EDS) in a single pass.
+        source: one TIFF whose pages interleave the channels slice by slice
+        (requires n_channels), or a list of TIFF files with one channel each.
+        names: channel names; colors: RGB (0-1) composite colour per channel.
+        The first channel becomes the active volume.
+        """
+        channels = read_channels(source, n_channels)
+        if names is None:
+            names = [f"Channel {i}" for i in range(len(channels))]
+        if len(names) != len(channels):
+            raise ValueError(f"Got {len(names)} names for {len(channels)} channels.")
+        self._set_channels(channels, list(names), colors)
+        depth, height, width = self.volume.shape
+        self.x_offset = width // 2
+        self.y_offset = height // 2
+        self.z_offset = depth // 2
+        return self.channels
+
+    def load_remote(self, url):
+        """
+        Use a running slice server (see FIB_Server) as the data source instead of a local file.
+        Every channel becomes a RemoteVolume that fetches slices, regions and
+        oblique planes on demand, so the full volume is never copied locally.
+        """
+        from FIB_Server import RemoteVolume
+
+        first = RemoteVolume(url)
+        names = first.channel_names
+        channels = [first] + [RemoteVolume(url, channel=name) for name in names[1:]]
+        self._set_channels(channels, list(names))
+        depth, height, width = self.volume.shape
+        self.x_offset = width // 2
+        self.y_offset = height // 2
+        self.z_offset = depth // 2
+        return self.volume
+
+    def _set_channels(self, channels, names, colors=None):
+        """
+        Install a (channel, depth, height, width) array, or a list of per-channel
+        volumes, and reset all caches.
+        """
+        self.channels = channels
+        self.channel_names = names
+        self.channel_colors = list(colors) if colors is not None else [
+            DEFAULT_COLORS[i % len(DEFAULT_COLORS)] for i in range(len(names))]
+        # Keep one view object per channel so cache identity checks stay valid.
+        self._channel_views = [channels[i] for i in range(len(names))]
+        self._channel_ranges = {}
+        self.slice_cache.clear()
+        self._reslicers = {}
+        self._projectors = {}
+        self.thickness = None
+        self.active_channel = 0
+        self.volume = self._channel_views[0]
         self.loaded = True
-        # Reset offsets to the center of the volume.
-        self.x_offset = self.dims[2] // 2
-        self.y_offset = self.dims[1] // 2
-        self.z_offset = self.dims[0] // 2
+
+    def _channel_index(self, channel):
+        """Resolve a channel name or index; None means the active channel."""
+        if channel is None:
+            return self.active_channel
+        if isinstance(channel, str):
+            if channel not in self.channel_names:
+                raise ValueError(f"Unknown channel {channel!r}; expected one of {self.channel_names}.")
+            return self.channel_names.index(channel)
+        return int(channel)
+
+    def set_channel(self, channel):
+        """
+        Make a channel (name or index) the active volume.
+        This only re-points self.volume at the channel's data; nothing is reloaded.
+        """
+        if not self.loaded:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        index = self._channel_index(channel)
+        if index != self.active_channel:
+            # A thickness map describes the channel it was computed from.
+            self.thickness = None
+        self.active_channel = index
+        self.volume = self._channel_views[self.active_channel]
         return self.volume
+
+    def channel_range(self, channel=None):
+        """Return the (min, max) intensity of a channel, computed once and cached."""
+        index = self._channel_index(channel)
+        if index not in self._channel_ranges:
+            view = self._channel_views[index]
+            self._channel_ranges[index] = (float(view.min()), float(view.max()))
+        return self._channel_ranges[index]
         
+    def get_slice(self, axis=0, index=None, channel=None):
+        """
+        Return a 2D axis-aligned slice of the volume as a NumPy array.
+        axis: 0 = axial (z), 1 = coronal (y), 2 = sagittal (x).
+        index: slice index; defaults to the current offset on that axis and is clamped to the volume.
+        channel: channel name or index; defaults to the active channel.
+        Slices come from a cache shared by all channels and are read-only.
+        """
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        if index is None:
+            index = (self.z_offset, self.y_offset, self.x_offset)[axis]
+        channel = self._channel_index(channel)
+        volume = self._channel_views[channel]
+        index = int(np.clip(index, 0, volume.shape[axis] - 1))
+        key = (channel, axis, index)
+        image = self.slice_cache.get(key)
+        if image is None:
+            # Basic indexing reads only the slice, also from memory-mapped or remote volumes.
+            selection = [slice(None)] * 3
+            selection[axis] = index
+            image = np.ascontiguousarray(volume[tuple(selection)])
+            self.slice_cache.put(key, image)
+        return image
+
+    def get_composite_slice(self, axis=0, index=None, channels=None, as_vtk=False):
+        """
+        Blend several channels of one slice into an RGB uint8 image.
+        channels: names or indices to blend (default: all), each tinted with its
+        channel colour and scaled by its intensity range.
+        Returns an (rows, columns, 3) array, or a 3-component vtkImageData if as_vtk is True.
+        """
+        if channels is None:
+            channels = range(len(self.channel_names))
+        indices = [self._channel_index(c) for c in channels]
+        slices = [self.get_slice(axis, index, c) for c in indices]
+        rgb = composite_rgb(slices,
+                            [self.channel_colors[c] for c in indices],
+                            [self.channel_range(c) for c in indices])
+        if as_vtk:
+            return self.numpy_to_vtk_image(rgb)
+        return rgb
+
+    def statistics(self, bins=256, chunk=64):
+        """
+        Return intensity statistics of the volume: min, max, mean, std and a histogram.
+        The volume is reduced in z-chunks of `chunk` slices, so no full-size
+        temporaries are created. The histogram is a (counts, bin_edges) pair.
+        """
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        volume = self.volume
+        low, high = float(volume.min()), float(volume.max())
+        counts = np.zeros(bins, dtype=np.int64)
+        total = 0.0
+        total_squared = 0.0
+        for z0 in range(0, volume.shape[0], chunk):
+            block = np.asarray(volume[z0:z0 + chunk], dtype=np.float64)
+            total += block.sum()
+            total_squared += np.square(block).sum()
+            block_counts, edges = np.histogram(block, bins=bins, range=(low, high))
+            counts += block_counts
+        size = volume.size
+        mean = total / size
+        return {
+            "min": low,
+            "max": high,
+            "mean": float(mean),
+            "std": float(np.sqrt(max(total_squared / size - mean * mean, 0.0))),
+            "histogram": (counts, edges),
+        }
+
+    def export(self, filename):
+        """
+        Write the volume to disk, choosing the format from the file extension:
+        .npy (NumPy), .tif/.tiff (multi-page TIFF) or .raw (headerless C-order bytes).
+        """
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        extension = str(filename).lower().rsplit(".", 1)[-1]
+        if extension == "npy":
+            np.save(filename, self.volume)
+        elif extension in ("tif", "tiff"):
+            import tifffile as tiff
+            tiff.imwrite(filename, self.volume)
+        elif extension == "raw":
+            np.ascontiguousarray(self.volume).tofile(filename)
+        else:
+            raise ValueError(f"Unsupported export format: {filename}")
+        return filename
+
     def get_vtk_image(self):
         """
         Convert a 2D axial slice (using the current z_offset) of the 3D volume 
         into a vtkImageData object.
         """
+        import vtk
+
         if not self.loaded or self.volume is None:
             raise ValueError("No volume loaded. Call load_image() first.")
         # Clamp z_offset to a valid index.
@@ -75,27 +292,202 @@ class FIBTomo:
         image_import.SetDataExtentToWholeExtent()
         image_import.Update()
         return image_import.GetOutput()
+
+    @staticmethod
+    def numpy_to_vtk_image(slice_2d, spacing=(1, 1)):
+        """
+        Convert a 2D NumPy array of any numeric dtype into a single-slice vtkImageData.
+        Rows map to the VTK y axis and columns to the x axis. A third array axis
+        (e.g. RGB) becomes the scalar components.
+        """
+        import vtk
+        import vtkmodules.util.numpy_support as numpy_support
+
+        height, width = slice_2d.shape[:2]
+        components = slice_2d.shape[2] if slice_2d.ndim == 3 else 1
+        vtk_image = vtk.vtkImageData()
+        vtk_image.SetDimensions(width, height, 1)
+        vtk_image.SetSpacing(spacing[0], spacing[1], 1)
+        vtk_array = numpy_support.numpy_to_vtk(
+            num_array=np.ascontiguousarray(slice_2d).reshape(-1, components),
+            deep=True,
+            array_type=numpy_support.get_vtk_array_type(slice_2d.dtype)
+        )
+        vtk_image.GetPointData().SetScalars(vtk_array)
+        return vtk_image
+
+    def _get_reslicer(self):
+        """Return the oblique reslicer for the current volume, creating it on first use."""
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        reslicer = self._reslicers.get(self.active_channel)
+        if reslicer is None or reslicer.volume is not self.volume:
+            reslicer = ObliqueReslicer(self.volume)
+            self._reslicers[self.active_channel] = reslicer
+        return reslicer
+
+    def get_oblique_slice(self, normal=(0, 0, 1), offset=0.0, rotation=0.0, step=1.0, as_vtk=False):
+        """
+        Extract an arbitrary plane through the volume with trilinear interpolation.
+        normal is given in (x, y, z) order and offset in voxels from the volume centre.
+        Sampling grids are cached, so moving the same plane along its normal is cheap.
+        Returns a 2D NumPy array, or a vtkImageData if as_vtk is True.
+        """
+        reslicer = self._get_reslicer()
+        if hasattr(self.volume, "oblique"):
+            # Remote volumes are resliced by the server.
+            plane = self.volume.oblique(normal, offset, rotation, step)
+        else:
+            plane = reslicer.reslice(normal, offset, rotation, step)
+        if as_vtk:
+            return self.numpy_to_vtk_image(plane, spacing=(step, step))
+        return plane
+
+    def get_oblique_geometry(self, normal=(0, 0, 1), offset=0.0, rotation=0.0, step=1.0):
+        """
+        Return (origin, u, v, n) describing where get_oblique_slice() places its
+        output in (x, y, z) voxel space.
+        """
+        reslicer = self._get_reslicer()
+        return reslicer.plane_geometry(normal, offset, rotation, step)
+    
+    def get_slab_projection(self, axis=0, center=None, thickness=10, mode="max", as_vtk=False):
+        """
+        Project a slab of `thickness` slices centred on `center` along `axis`.
+        axis: 0 = axial (z), 1 = coronal (y), 2 = sagittal (x).
+        center: slice index of the slab centre; defaults to the current offset on that axis.
+        mode: "max" (MIP), "min" (MinIP) or "mean" (average projection).
+        Consecutive calls with overlapping slabs only process the slices that changed.
+        Returns a 2D NumPy array, or a vtkImageData if as_vtk is True.
+        """
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        if center is None:
+            center = (self.z_offset, self.y_offset, self.x_offset)[axis]
+        projector = self._projectors.get((self.active_channel, axis))
+        if projector is None or projector.volume is not self.volume:
+            # Only the active channel keeps projectors; the three axes share the pyramid budget.
+            self._projectors = {key: p for key, p in self._projectors.items() if key[0] == self.active_channel}
+            projector = SlabProjector(self.volume, axis=axis, pyramid_bytes=self.projection_bytes // 3)
+            self._projectors[(self.active_channel, axis)] = projector
+        projection = projector.project_slab(center, thickness, mode)
+        if as_vtk:
+            return self.numpy_to_vtk_image(projection)
+        return projection
+    
+    def analyze_particles(self, threshold=None, invert=False, spacing=(1.0, 1.0, 1.0),
+                          connectivity=26, memory_budget=512 * 1024 ** 2, out=None, csv_file=None):
+        """
+        Label connected particles (or pores, with invert=True) and measure each one.
+        Voxels above threshold are foreground; spacing is the voxel size along (z, y, x).
+        Labelling runs in z-chunks within memory_budget. out may be a np.memmap
+        or a .npy file path; by default labels that do not fit the budget are
+        written to a temporary memory-mapped file.
+        Returns (labels, measurements), where measurements is a dict of per-label
+        columns; if csv_file is given the table is also written there.
+        """
+        # SciPy is only needed for analysis, so it is imported on demand.
+        from FIB_Analysis import ParticleAnalyzer
+
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        analyzer = ParticleAnalyzer(self.volume, spacing=spacing, connectivity=connectivity,
+                                    memory_budget=memory_budget)
+        labels, _ = analyzer.label(threshold=threshold, invert=invert, out=out)
+        measurements = analyzer.measure()
+        if csv_file is not None:
+            analyzer.export_csv(csv_file)
+        return labels, measurements
     
-    def create_vtk_volume(self, image_stack=None):
+    def filter_volume(self, name, out=None, workers=None, **params):
+        """
+        Apply a built-in 3D filter block by block across a process pool.
+        name: "gaussian" (sigma), "median" (size) or "morphology" (operation, size).
+        out: None, a .npy file path to write a memory-mapped result, or an array-like.
+        The loaded volume is left unchanged; the filtered array is returned.
+        """
+        # SciPy is only needed for filtering, so it is imported on demand.
+        from FIB_Blockwise import FILTERS
+
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter {name!r}; expected one of {sorted(FILTERS)}.")
+        return FILTERS[name](self.volume, out=out, workers=workers, **params)
+    
+    def compute_local_thickness(self, threshold, pores=True, spacing=(1.0, 1.0, 1.0), sizes=25, workers=None):
+        """
+        Compute a local thickness (pore-size) map of the segmented volume.
+        Voxels at or below threshold are pores; with pores=False the solid
+        phase above the threshold is measured instead.
+        spacing is the voxel size along (z, y, x); thicknesses are in the same units.
+        The map is stored in self.thickness and returned.
+        """
+        if not self.loaded or self.volume is None:
+            raise ValueError("No volume loaded. Call load_image() first.")
+        # Segment in z-chunks so only the boolean mask is held in full, also
+        # for memory-mapped and remote volumes.
+        mask = np.empty(self.volume.shape, dtype=bool)
+        for z0 in range(0, self.volume.shape[0], 64):
+            block = np.asarray(self.volume[z0:z0 + 64])
+            mask[z0:z0 + 64] = block <= threshold if pores else block > threshold
+        self.thickness = local_thickness(mask, spacing=spacing, sizes=sizes, workers=workers)
+        self.thickness_spacing = spacing
+        return self.thickness
+
+    def thickness_distribution(self, bins=25):
+        """Return (bin_edges, volume_fraction) of the last computed local thickness map."""
+        if self.thickness is None:
+            raise ValueError("No thickness map. Call compute_local_thickness() first.")
+        return size_distribution(self.thickness, bins=bins, spacing=self.thickness_spacing)
+    
+    def create_vtk_volume(self, image_stack=None, channels=None, step=1):
         """
         Convert a NumPy image stack into vtkImageData with proper orientation.
         If image_stack is None, the loaded volume is used.
+        If channels (names or indices) are given, those channels are uploaded
+        together as one multi-component vtkImageData for composite rendering.
+        step > 1 uploads every step-th voxel along each axis, with the spacing
+        scaled so the volume keeps its size in voxel coordinates.
         """
+        import vtk
+        import vtkmodules.util.numpy_support as numpy_support
+
+        subsample = (slice(None, None, step),) * 3
+        if channels is not None:
+            indices = [self._channel_index(c) for c in channels]
+            # (depth, height, width, channel) in C order is VTK's x-fastest tuple order.
+            interleaved = np.stack([np.asarray(self._channel_views[c][subsample]) for c in indices], axis=-1)
+            depth, height, width = interleaved.shape[:3]
+            vtk_data = vtk.vtkImageData()
+            vtk_data.SetDimensions(width, height, depth)
+            vtk_data.SetSpacing(step, step, step)
+            # The stacked copy is handed to VTK as is; numpy_to_vtk keeps it alive.
+            vtk_array = numpy_support.numpy_to_vtk(
+                num_array=interleaved.reshape(-1, len(indices)),
+                deep=False,
+                array_type=numpy_support.get_vtk_array_type(interleaved.dtype)
+            )
+            vtk_data.GetPointData().SetScalars(vtk_array)
+            return vtk_data
+
         if image_stack is None:
             if not self.loaded or self.volume is None:
                 raise ValueError("No volume loaded. Call load_image() first.")
             image_stack = self.volume
+        image_stack = np.asarray(image_stack[subsample])
         depth, height, width = image_stack.shape
 
         vtk_data = vtk.vtkImageData()
         vtk_data.SetDimensions(width, height, depth)
-        vtk_data.SetSpacing(1, 1, 1)
-        # Transpose the array to match VTK's (x, y, z) order.
+        vtk_data.SetSpacing(step, step, step)
+        # Transpose the array to match VTK's (x, y, z) order. For a contiguous
+        # stack this is a view, which VTK shares instead of copying.
         transposed = np.transpose(image_stack, (2, 1, 0))
         vtk_array = numpy_support.numpy_to_vtk(
-            num_array=transposed.ravel(order="F"), 
-            deep=True, 
-            array_type=vtk.VTK_UNSIGNED_CHAR
+            num_array=transposed.ravel(order="F"),
+            deep=False,
+            array_type=numpy_support.get_vtk_array_type(image_stack.dtype)
         )
         vtk_data.GetPointData().SetScalars(vtk_array)
 
@@ -107,6 +499,9 @@ class FIBTomo:
         Axial (z), coronal (y), and sagittal (x) slices are shown side-by-side.
         If vtk_data is not provided, the volume is used.
         """
+        import vtk
+        from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor
+
         if vtk_data is None:
             vtk_data = self.create_vtk_volume()
         
@@ -167,6 +562,8 @@ class FIBTomo:
         Perform volume rendering of the volume and display it in an interactive render window.
         If vtk_data is not provided, the loaded volume is used.
         """
+        import vtk
+
         if vtk_data is None:
             vtk_data = self.create_vtk_volume()
             
@@ -211,6 +608,8 @@ class FIBTomo:
         Create an animation from slices of the volume dataset.
         The animation displays combined views of axial, coronal, and sagittal slices.
         """
+        import cv2
+
         if not self.loaded or self.volume is None:
             raise ValueError("No volume loaded. Call load_image() first.")
         depth, height, width = self.volume.shape
@@ -1,23 +1,103 @@
 import sys
 import math
+import threading
+import numpy as np
 import vtk
 from PySide6.QtWidgets import (QApplication, QWidget, QHBoxLayout, QVBoxLayout, QLabel, 
                                QComboBox, QSlider, QSplitter)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QPainter
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from FIB_RenderQuality import RenderQualityGovernor
 from FIB_Tomo import FIBTomo
 
-class FIBTomoVTKApp(QWidget):
+class HistogramWidget(QWidget):
+    """Minimal bar chart of a histogram, e.g. the local thickness size distribution."""
+    
     def __init__(self, parent=None):
         super().__init__(parent)
-        # Instantiate FIBTomo and load the TIFF stack.
+        self.edges = None
+        self.values = None
+        self.setMinimumHeight(120)
+    
+    def set_data(self, edges, values):
+        self.edges = edges
+        self.values = values
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(40, 40, 60))
+        if self.values is None or len(self.values) == 0 or self.values.max() <= 0:
+            painter.end()
+            return
+        margin = 16
+        width = self.width()
+        height = self.height() - margin
+        bar_width = width / len(self.values)
+        scale = height / self.values.max()
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(230, 150, 60))
+        for i, value in enumerate(self.values):
+            bar_height = value * scale
+            painter.drawRect(int(i * bar_width), int(height - bar_height),
+                             max(1, int(bar_width) - 1), int(bar_height))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(2, self.height() - 2, "0")
+        label = f"{self.edges[-1]:.1f}"
+        painter.drawText(width - painter.fontMetrics().horizontalAdvance(label) - 2, self.height() - 2, label)
+        painter.end()
+
+class FIBTomoVTKApp(QWidget):
+    
+    # Emitted from the worker thread with (generation, thickness, edges, fractions).
+    thickness_ready = Signal(object)
+    
+    # View modes that show the axial/coronal/sagittal triplanar layout.
+    ORTHOGONAL_MODES = ("Slice View", "Slab Projection", "Local Thickness")
+    
+    def __init__(self, parent=None, target_fps=15.0, idle_delay_ms=250,
+                 filename=r'./image_stack.tif', channel_names=None, n_channels=None,
+                 max_volume_voxels=512 ** 3):
+        """
+        target_fps: interactive frame rate the render-quality governor aims for.
+        idle_delay_ms: time without changes after which full quality is restored.
+        filename: TIFF stack to load, a list of TIFF stacks with one detector channel each,
+        or the URL of a running slice server (see FIB_Server).
+        channel_names: names of the detector channels (e.g. ["SE", "BSE"]).
+        n_channels: number of channels interleaved page by page in a single TIFF.
+        max_volume_voxels: volumes larger than this are subsampled before being
+        uploaded for volume rendering; slices are always shown at full resolution.
+        """
+        super().__init__(parent)
+        # Instantiate FIBTomo and load the TIFF stack (all channels in one pass).
         self.tomo = FIBTomo()
-        self.tomo.load_image(r'./image_stack.tif')
+        if isinstance(filename, str) and filename.startswith(("http://", "https://")):
+            self.tomo.load_remote(filename)
+        elif isinstance(filename, (list, tuple)) or n_channels:
+            self.tomo.load_channels(filename, channel_names, n_channels)
+        else:
+            self.tomo.load_image(filename)
+        self.max_volume_voxels = max_volume_voxels
+        # Show all channels blended instead of only the active one.
+        self.composite = False
+        # Uploaded vtkImageData for the channel last shown and for "Composite",
+        # reused when switching back; other channels are rebuilt on demand.
+        self.vtk_volumes = {}
         # Set initial offsets to something other than the center:
         
         # Set initial opacities.
         self.slice_opacity = 1.0
         self.volume_opacity = 1.0
+        # Sample spacing (in voxels) of the oblique plane while a slider is dragged.
+        self.oblique_preview_step = 2.0
+        # Local thickness map on display and its largest value, used to scale it.
+        # Maps are computed on a worker thread; only the latest request is shown.
+        self.thickness_map = None
+        self.thickness_max = 0.0
+        self._thickness_generation = 0
+        self._thickness_lock = threading.Lock()
+        self.thickness_ready.connect(self.show_thickness_map)
 
         # Create the QVTKRenderWindowInteractor widget.
         self.vtkWidget = QVTKRenderWindowInteractor(self)
@@ -28,18 +108,42 @@ class FIBTomoVTKApp(QWidget):
         self.renderer.SetBackground(0.2, 0.2, 0.4)
         self.render_window.AddRenderer(self.renderer)
         
+        # Adaptive render quality: coarser sampling while interacting, full quality when idle.
+        self.governor = RenderQualityGovernor(self.render_window, target_frame_time=1.0 / target_fps)
+        self.governor.add_listener(self.update_fps_label)
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_delay_ms)
+        self.idle_timer.timeout.connect(self.governor.end_interaction)
+        # Slider changes are coalesced into at most one render per event-loop pass.
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(0)
+        self.render_timer.timeout.connect(self.render_window.Render)
+        
         # Create the left control panel.
         self.control_panel = QWidget()
         control_layout = QVBoxLayout(self.control_panel)
         
         # 1. View mode selection box.
         self.view_combo = QComboBox()
-        self.view_combo.addItems(["Volume Rendering", "Slice View"])
+        self.view_combo.addItems(["Volume Rendering", "Slice View", "Slab Projection", "Oblique Slice", "Local Thickness"])
         self.view_combo.setCurrentText("Volume Rendering")
         self.view_combo.currentTextChanged.connect(self.change_view_mode)
         control_layout.addWidget(QLabel("Select view mode:"))
         control_layout.addWidget(self.view_combo)
         
+        # Detector channel selection; "Composite" blends all channels in colour.
+        self.channel_combo = QComboBox()
+        self.channel_combo.addItems(self.tomo.channel_names)
+        if len(self.tomo.channel_names) > 1:
+            self.channel_combo.addItem("Composite")
+        self.channel_combo.currentTextChanged.connect(self.change_channel)
+        control_layout.addWidget(QLabel("Channel:"))
+        control_layout.addWidget(self.channel_combo)
+        self.fps_label = QLabel("Render: -- FPS")
+        control_layout.addWidget(self.fps_label)
+        
         # 2. X, Y, Z offset sliders.
         self.x_slider = QSlider(Qt.Horizontal)
         self.y_slider = QSlider(Qt.Horizontal)
@@ -69,6 +173,59 @@ class FIBTomoVTKApp(QWidget):
         control_layout.addWidget(QLabel("Slice Opacity:"))
         control_layout.addWidget(self.slice_opacity_slider)
         
+        # 5. Slab projection mode and thickness (in slices).
+        self.projection_combo = QComboBox()
+        self.projection_combo.addItems(["max", "min", "mean"])
+        self.projection_combo.currentTextChanged.connect(self.update_slice_offset)
+        self.slab_thickness_slider = QSlider(Qt.Horizontal)
+        self.slab_thickness_slider.setRange(1, 100)
+        self.slab_thickness_slider.setValue(10)
+        self.slab_thickness_slider.valueChanged.connect(self.update_slice_offset)
+        control_layout.addWidget(QLabel("Slab Projection (MIP / MinIP / Mean):"))
+        control_layout.addWidget(self.projection_combo)
+        control_layout.addWidget(QLabel("Slab Thickness:"))
+        control_layout.addWidget(self.slab_thickness_slider)
+        
+        # 6. Oblique plane orientation (degrees) and offset along its normal.
+        self.tilt_slider = QSlider(Qt.Horizontal)
+        self.tilt_slider.setRange(0, 180)
+        self.tilt_slider.setValue(45)
+        self.azimuth_slider = QSlider(Qt.Horizontal)
+        self.azimuth_slider.setRange(0, 360)
+        self.azimuth_slider.setValue(0)
+        self.oblique_offset_slider = QSlider(Qt.Horizontal)
+        for slider in [self.tilt_slider, self.azimuth_slider, self.oblique_offset_slider]:
+            slider.valueChanged.connect(self.update_oblique_plane)
+            # Re-sample at full resolution once a drag ends.
+            slider.sliderReleased.connect(self.update_oblique_plane)
+        control_layout.addWidget(QLabel("Oblique Tilt:"))
+        control_layout.addWidget(self.tilt_slider)
+        control_layout.addWidget(QLabel("Oblique Azimuth:"))
+        control_layout.addWidget(self.azimuth_slider)
+        control_layout.addWidget(QLabel("Oblique Offset:"))
+        control_layout.addWidget(self.oblique_offset_slider)
+        
+        # 7. Segmentation and size distribution for the local thickness map.
+        self.phase_combo = QComboBox()
+        self.phase_combo.addItems(["Pores", "Solid"])
+        self.phase_combo.currentTextChanged.connect(self.update_thickness_map)
+        self.threshold_slider = QSlider(Qt.Horizontal)
+        self.threshold_slider.setRange(0, 255)
+        self.threshold_slider.setValue(128)
+        # While dragging, the map is recomputed only once the slider is released;
+        # keyboard and click changes recompute straight away.
+        self.threshold_slider.valueChanged.connect(self.threshold_changed)
+        self.threshold_slider.sliderReleased.connect(self.update_thickness_map)
+        self.histogram_widget = HistogramWidget()
+        self.thickness_status = QLabel("")
+        control_layout.addWidget(QLabel("Local Thickness Phase:"))
+        control_layout.addWidget(self.phase_combo)
+        control_layout.addWidget(QLabel("Segmentation Threshold:"))
+        control_layout.addWidget(self.threshold_slider)
+        control_layout.addWidget(QLabel("Size Distribution (volume fraction):"))
+        control_layout.addWidget(self.histogram_widget)
+        control_layout.addWidget(self.thickness_status)
+        
         control_layout.addStretch()
         
         # Create a splitter: left (controls) and right (VTK widget) with ratio 2:3.
@@ -85,6 +242,7 @@ class FIBTomoVTKApp(QWidget):
         # Initialize and start the VTK interactor.
         self.vtkWidget.Initialize()
         self.vtkWidget.Start()
+        self.governor.attach_interactor(self.render_window.GetInteractor())
         
         # Set initial view mode.
         self.change_view_mode(self.view_combo.currentText())
@@ -101,6 +259,18 @@ class FIBTomoVTKApp(QWidget):
         For "Slice View" mode:
           - Set slider ranges to the full object dimensions.
           - Set slider values to the center (for an isometric triplanar view).
+          
+        For "Slab Projection" mode:
+          - Same as "Slice View", but each plane shows a projection over a slab
+            of the selected thickness around the slice offset.
+          
+        For "Local Thickness" mode:
+          - Same as "Slice View", showing the colour-mapped local thickness of
+            the selected phase and its size distribution histogram.
+          
+        For "Oblique Slice" mode:
+          - Show a single resliced plane, oriented by the tilt/azimuth sliders.
+          - Set the offset slider range to +/- half the volume diagonal.
         """
         # Get the volume dimensions.
         # FIBTomo volume shape is assumed to be (depth, height, width)
@@ -119,7 +289,9 @@ class FIBTomoVTKApp(QWidget):
             self.renderer.RemoveAllViewProps()
             self.volume_actor = self.get_volume_actor()
             self.renderer.AddVolume(self.volume_actor)
-        elif mode == "Slice View":
+        elif mode in self.ORTHOGONAL_MODES:
+            if mode == "Local Thickness" and self.thickness_map is None:
+                self.compute_thickness_map()
             # Set slider ranges and set initial values to the center.
             self.x_slider.setRange(0, width)
             self.y_slider.setRange(0, height)
@@ -135,9 +307,90 @@ class FIBTomoVTKApp(QWidget):
             self.slice_actors = self.create_orthogonal_slice_actors()
             for actor in self.slice_actors:
                 self.renderer.AddActor(actor)
+        elif mode == "Oblique Slice":
+            # The plane can be offset up to half the volume diagonal either way.
+            half_diagonal = int(math.ceil(math.sqrt(depth ** 2 + height ** 2 + width ** 2) / 2.0))
+            self.renderer.RemoveAllViewProps()
+            self.oblique_actor = vtk.vtkImageActor()
+            self.oblique_actor.GetProperty().SetOpacity(self.slice_opacity)
+            self.renderer.AddActor(self.oblique_actor)
+            self.renderer.AddActor(self.create_outline_actor())
+            self.oblique_offset_slider.setRange(-half_diagonal, half_diagonal)
+            self.oblique_offset_slider.setValue(0)
+            self.update_oblique_plane()
         self.renderer.ResetCamera()
         self.render_window.Render()
     
+    def change_channel(self, name):
+        """
+        Switch the displayed channel without reloading data or resetting the view.
+        "Composite" blends all channels in Slice View and Volume Rendering; the
+        other modes keep showing the last single channel.
+        """
+        self.composite = name == "Composite"
+        if not self.composite:
+            self.tomo.set_channel(name)
+            # The thickness map belongs to the previous channel.
+            self.thickness_map = None
+            self.update_thickness_map()
+        mode = self.view_combo.currentText()
+        if mode == "Volume Rendering":
+            self.renderer.RemoveVolume(self.volume_actor)
+            self.volume_actor = self.get_volume_actor()
+            self.renderer.AddVolume(self.volume_actor)
+            self.request_render()
+        elif mode == "Oblique Slice":
+            self.update_oblique_plane()
+        else:
+            self.update_slice_offset()
+    
+    def oblique_normal(self):
+        """Return the oblique plane normal in (x, y, z) order from the tilt and azimuth sliders."""
+        tilt = math.radians(self.tilt_slider.value())
+        azimuth = math.radians(self.azimuth_slider.value())
+        return (math.sin(tilt) * math.cos(azimuth),
+                math.sin(tilt) * math.sin(azimuth),
+                math.cos(tilt))
+    
+    def update_oblique_plane(self):
+        """
+        Re-sample the oblique plane from the orientation and offset sliders.
+        While a slider is being dragged the plane is sampled at a coarser step
+        so that it stays interactive on large volumes.
+        """
+        if self.view_combo.currentText() != "Oblique Slice" or not hasattr(self, "oblique_actor"):
+            return
+        dragging = any(slider.isSliderDown() for slider in
+                       [self.tilt_slider, self.azimuth_slider, self.oblique_offset_slider])
+        step = self.oblique_preview_step if dragging else 1.0
+        normal = self.oblique_normal()
+        offset = self.oblique_offset_slider.value()
+        image = self.tomo.get_oblique_slice(normal, offset, step=step, as_vtk=True)
+        origin, u, v, n = self.tomo.get_oblique_geometry(normal, offset, step=step)
+        
+        # Place the image in voxel space: its x/y axes follow u/v, z follows n.
+        matrix = vtk.vtkMatrix4x4()
+        for row in range(3):
+            matrix.SetElement(row, 0, u[row])
+            matrix.SetElement(row, 1, v[row])
+            matrix.SetElement(row, 2, n[row])
+            matrix.SetElement(row, 3, origin[row])
+        self.oblique_actor.GetMapper().SetInputData(image)
+        self.oblique_actor.SetUserMatrix(matrix)
+        self.request_render()
+    
+    def create_outline_actor(self):
+        """Create a wireframe box outlining the volume bounds in voxel space."""
+        depth, height, width = self.tomo.volume.shape
+        outline = vtk.vtkOutlineSource()
+        outline.SetBounds(0, width - 1, 0, height - 1, 0, depth - 1)
+        mapper = vtk.vtkPolyDataMapper()
+        mapper.SetInputConnection(outline.GetOutputPort())
+        actor = vtk.vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().SetColor(1.0, 1.0, 1.0)
+        return actor
+    
     def update_slice_offset(self):
         """
         Update the slice offsets from the slider values.
@@ -149,7 +402,7 @@ class FIBTomoVTKApp(QWidget):
         z = self.z_slider.value()
         self.tomo.update_slice(x, y, z)
         mode = self.view_combo.currentText()
-        if mode == "Slice View":
+        if mode in self.ORTHOGONAL_MODES:
             self.renderer.RemoveAllViewProps()
             self.slice_actors = self.create_orthogonal_slice_actors()
             for actor in self.slice_actors:
@@ -161,32 +414,67 @@ class FIBTomoVTKApp(QWidget):
                 self.plane_y.SetOrigin(0, y, 0)
             if hasattr(self, "plane_z"):
                 self.plane_z.SetOrigin(0, 0, z)
-        self.renderer.ResetCamera()
-        self.render_window.Render()
+        self.request_render()
+    
+    def request_render(self):
+        """
+        Schedule an interactive render instead of rendering synchronously.
+        Quality is lowered by the governor until no change has arrived for the
+        idle delay, after which a full-quality frame is rendered.
+        """
+        self.governor.begin_interaction()
+        self.idle_timer.start()
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+    
+    def update_fps_label(self, fps, interacting):
+        """Show the frame rate achieved by the last renders."""
+        state = "interactive" if interacting else "full quality"
+        self.fps_label.setText(f"Render: {fps:.1f} FPS ({state})")
     
     def update_volume_opacity(self, value):
         """Update the volume rendering opacity via the scalar opacity transfer function."""
         self.volume_opacity = value / 100.0
         if self.view_combo.currentText() == "Volume Rendering":
-            opacity_transfer = vtk.vtkPiecewiseFunction()
-            opacity_transfer.AddPoint(0, 0.0)
-            opacity_transfer.AddPoint(255, self.volume_opacity)
-            self.volume_actor.GetProperty().SetScalarOpacity(opacity_transfer)
-            self.render_window.Render()
+            # Edit the existing transfer functions in place rather than replacing them.
+            for opacity_transfer in self.opacity_transfers:
+                opacity_transfer.RemoveAllPoints()
+                opacity_transfer.AddPoint(0, 0.0)
+                opacity_transfer.AddPoint(255, self.volume_opacity)
+            self.request_render()
     
     def update_slice_opacity(self, value):
         """Update the opacity for each slice actor."""
         self.slice_opacity = value / 100.0
-        if self.view_combo.currentText() == "Slice View":
+        if self.view_combo.currentText() in self.ORTHOGONAL_MODES:
             for actor in self.slice_actors:
                 actor.GetProperty().SetOpacity(self.slice_opacity)
-            self.render_window.Render()
+            self.request_render()
+        elif self.view_combo.currentText() == "Oblique Slice":
+            self.oblique_actor.GetProperty().SetOpacity(self.slice_opacity)
+            self.request_render()
     
     def get_volume_actor(self):
         """
         Create and return a vtkVolume actor with clipping planes based on offset sliders.
+        In composite mode the channels are rendered as independent components,
+        each with its own colour.
         """
-        vtk_data = self.tomo.create_vtk_volume()
+        # The volume mappers support at most four independent components.
+        channels = self.tomo.channel_names[:4] if self.composite else [self.tomo.channel_names[self.tomo.active_channel]]
+        key = "Composite" if self.composite else channels[0]
+        vtk_data = self.vtk_volumes.get(key)
+        if vtk_data is None:
+            self.vtk_volumes = {k: v for k, v in self.vtk_volumes.items() if k == "Composite"}
+            # Smallest voxel step that keeps the uploaded volume within budget.
+            step = 1
+            while self.tomo.volume.size > self.max_volume_voxels * step ** 3:
+                step += 1
+            if self.composite:
+                vtk_data = self.tomo.create_vtk_volume(channels=channels, step=step)
+            else:
+                vtk_data = self.tomo.create_vtk_volume(step=step)
+            self.vtk_volumes[key] = vtk_data
         self.volume_mapper = vtk.vtkSmartVolumeMapper()
         self.volume_mapper.SetInputData(vtk_data)
         
@@ -213,13 +501,25 @@ class FIBTomoVTKApp(QWidget):
         volume_property.ShadeOn()
         volume_property.SetInterpolationTypeToLinear()
         volume_property.SetScalarOpacityUnitDistance(1)
-        opacity_transfer = vtk.vtkPiecewiseFunction()
-        opacity_transfer.AddPoint(0, 0.0)
-        opacity_transfer.AddPoint(255, self.volume_opacity)
-        volume_property.SetScalarOpacity(opacity_transfer)
+        self.opacity_transfers = []
+        if self.composite:
+            volume_property.IndependentComponentsOn()
+        for component, name in enumerate(channels):
+            opacity_transfer = vtk.vtkPiecewiseFunction()
+            opacity_transfer.AddPoint(0, 0.0)
+            opacity_transfer.AddPoint(255, self.volume_opacity)
+            volume_property.SetScalarOpacity(component, opacity_transfer)
+            self.opacity_transfers.append(opacity_transfer)
+            if self.composite:
+                color = self.tomo.channel_colors[self.tomo.channel_names.index(name)]
+                color_transfer = vtk.vtkColorTransferFunction()
+                color_transfer.AddRGBPoint(0, 0.0, 0.0, 0.0)
+                color_transfer.AddRGBPoint(255, *color)
+                volume_property.SetColor(component, color_transfer)
         
         volume = vtk.vtkVolume()
         volume.SetMapper(self.volume_mapper)
+        self.governor.set_mapper(self.volume_mapper)
         volume.SetProperty(volume_property)
         return volume
     
@@ -228,8 +528,8 @@ class FIBTomoVTKApp(QWidget):
         Create and return three vtkImageActor objects for axial, coronal, and sagittal slices,
         arranged so that their centers coincide (i.e. an isometric triplanar view centered on the volume).
         """
-        # Axial slice (XY plane) from self.tomo.get_vtk_image()
-        axial_image = self.tomo.get_vtk_image()
+        # Axial slice (XY plane) at the z offset.
+        axial_image = self.create_display_image(self.get_display_slice(0, self.tomo.z_offset))
         dims = axial_image.GetDimensions()  # (width, height, 1)
         width, height = dims[0], dims[1]
         axial_actor = vtk.vtkImageActor()
@@ -239,9 +539,8 @@ class FIBTomoVTKApp(QWidget):
         axial_actor.SetPosition(-width / 2.0, -height / 2.0, 0)
         
         # Coronal slice (YZ plane): slice from volume at y offset.
-        y_index = int(self.tomo.y_offset)
-        coronal_slice = self.tomo.volume[:, y_index, :]  # shape: (depth, width)
-        coronal_image = self.convert_numpy_to_vtk_image(coronal_slice)
+        coronal_slice = self.get_display_slice(1, self.tomo.y_offset)  # shape: (depth, width)
+        coronal_image = self.create_display_image(coronal_slice)
         dims_corr = coronal_image.GetDimensions()  # (width_corr, depth_corr, 1)
         width_corr, depth_corr = dims_corr[0], dims_corr[1]
         coronal_actor = vtk.vtkImageActor()
@@ -253,9 +552,8 @@ class FIBTomoVTKApp(QWidget):
         coronal_actor.SetPosition(-width_corr / 2.0, -depth_corr / 2.0, 0)
         
         # Sagittal slice (XZ plane): slice from volume at x offset.
-        x_index = int(self.tomo.x_offset)
-        sagittal_slice = self.tomo.volume[:, :, x_index]  # shape: (depth, height)
-        sagittal_image = self.convert_numpy_to_vtk_image(sagittal_slice)
+        sagittal_slice = self.get_display_slice(2, self.tomo.x_offset)  # shape: (depth, height)
+        sagittal_image = self.create_display_image(sagittal_slice)
         dims_sag = sagittal_image.GetDimensions()  # (width_sag, height_sag, 1)
         # For sagittal, the array shape is (depth, height) so interpret width_sag as height and height_sag as depth.
         height_sag, depth_sag = dims_sag[0], dims_sag[1]
@@ -267,16 +565,111 @@ class FIBTomoVTKApp(QWidget):
         
         return [axial_actor, coronal_actor, sagittal_actor]
     
+    def get_display_slice(self, axis, index):
+        """
+        Return the 2D image shown for one orthogonal plane.
+        In "Slab Projection" mode this is a projection over a slab centred on
+        index, in "Local Thickness" mode the thickness map scaled to 0-255,
+        otherwise the single slice at index.
+        """
+        volume = self.tomo.volume
+        index = int(np.clip(index, 0, volume.shape[axis] - 1))
+        if self.view_combo.currentText() == "Local Thickness":
+            if self.thickness_map is None:
+                # Still being computed: show the plane black until it arrives.
+                return np.zeros([size for a, size in enumerate(volume.shape) if a != axis], dtype=np.uint8)
+            thickness = np.take(self.thickness_map, index, axis=axis)
+            scale = 255.0 / self.thickness_max if self.thickness_max > 0 else 0.0
+            return np.rint(thickness * scale).astype(np.uint8)
+        if self.view_combo.currentText() == "Slab Projection":
+            projection = self.tomo.get_slab_projection(
+                axis, index, self.slab_thickness_slider.value(), self.projection_combo.currentText())
+            if projection.dtype != volume.dtype:
+                # Mean projections are float; show them in the volume's dtype.
+                projection = np.rint(projection).astype(volume.dtype)
+            return projection
+        if self.composite and self.view_combo.currentText() == "Slice View":
+            return self.tomo.get_composite_slice(axis, index)
+        return self.tomo.get_slice(axis, index)
+    
+    def create_display_image(self, np_array):
+        """
+        Convert a displayed 2D slice to vtkImageData, colour-mapping it in
+        "Local Thickness" mode (black outside the phase, blue thin to red thick).
+        """
+        image = self.convert_numpy_to_vtk_image(np_array)
+        if self.view_combo.currentText() != "Local Thickness":
+            return image
+        lookup = vtk.vtkLookupTable()
+        lookup.SetRange(0, 255)
+        lookup.SetHueRange(0.667, 0.0)
+        lookup.Build()
+        lookup.SetTableValue(0, 0.0, 0.0, 0.0, 1.0)
+        colors = vtk.vtkImageMapToColors()
+        colors.SetLookupTable(lookup)
+        colors.SetInputData(image)
+        colors.Update()
+        return colors.GetOutput()
+    
+    def compute_thickness_map(self):
+        """
+        Start computing the local thickness of the selected phase on a worker thread.
+        The current map stays on display until the new one arrives in show_thickness_map().
+        """
+        self._thickness_generation += 1
+        pores = self.phase_combo.currentText() == "Pores"
+        self.thickness_status.setText("Computing local thickness...")
+        worker = threading.Thread(target=self._thickness_worker, daemon=True,
+                                  args=(self._thickness_generation, self.threshold_slider.value(), pores))
+        worker.start()
+    
+    def _thickness_worker(self, generation, threshold, pores):
+        """Compute one thickness map, skipping requests superseded while waiting for the lock."""
+        with self._thickness_lock:
+            if generation != self._thickness_generation:
+                return
+            thickness = self.tomo.compute_local_thickness(threshold, pores=pores)
+            edges, fractions = self.tomo.thickness_distribution()
+        self.thickness_ready.emit((generation, thickness, edges, fractions))
+    
+    def show_thickness_map(self, result):
+        """Display a finished thickness map and its size distribution (runs on the GUI thread)."""
+        generation, thickness, edges, fractions = result
+        if generation != self._thickness_generation:
+            return
+        self.thickness_map = thickness
+        self.thickness_max = float(thickness.max())
+        self.histogram_widget.set_data(edges, fractions)
+        self.thickness_status.setText("")
+        if self.view_combo.currentText() == "Local Thickness":
+            self.update_slice_offset()
+    
+    def threshold_changed(self):
+        """Recompute on keyboard or click changes; drags wait for the release."""
+        if not self.threshold_slider.isSliderDown():
+            self.update_thickness_map()
+    
+    def update_thickness_map(self):
+        """Recompute the thickness map after the phase or threshold changed."""
+        if self.view_combo.currentText() != "Local Thickness":
+            # Recomputed on demand the next time the mode is shown; any map
+            # still being computed is for the old settings and is dropped.
+            self._thickness_generation += 1
+            self.thickness_map = None
+            return
+        self.compute_thickness_map()
+    
     def convert_numpy_to_vtk_image(self, np_array):
         """
-        Convert a 2D NumPy array to a vtkImageData object.
+        Convert a 2D NumPy array (or an RGB array of shape (rows, columns, 3)) to a vtkImageData object.
         """
-        height, width = np_array.shape
+        height, width = np_array.shape[:2]
+        components = np_array.shape[2] if np_array.ndim == 3 else 1
         data_string = np_array.tobytes()
         image_import = vtk.vtkImageImport()
         image_import.CopyImportVoidPointer(data_string, len(data_string))
         image_import.SetDataScalarTypeToUnsignedChar()
-        image_import.SetNumberOfScalarComponents(1)
+        image_import.SetNumberOfScalarComponents(components)
         image_import.SetWholeExtent(0, width - 1, 0, height - 1, 0, 0)
         image_import.SetDataExtentToWholeExtent()
         image_import.Update()
@@ -354,6 +747,14 @@ class FIBTomoVTKApp(QWidget):
     
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = FIBTomoVTKApp()
+    # Optional arguments: one TIFF stack, one TIFF stack per detector channel,
+    # or the URL of a slice server, e.g. http://127.0.0.1:8765.
+    files = sys.argv[1:]
+    if len(files) > 1:
+        window = FIBTomoVTKApp(filename=files)
+    elif files:
+        window = FIBTomoVTKApp(filename=files[0])
+    else:
+        window = FIBTomoVTKApp()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -1,18 +1,15 @@
-from PIL import Image, ImageSequence
-import os
 import numpy as np
-import matplotlib.pyplot as plt
-import cv2 
 import vtk
-import numpy as np
-import tifffile as tiff
-import os
 import vtkmodules.util.numpy_support as numpy_support
 
 class VTK3DReconstruction:
-    def __init__(self):
-        """Initialize VTK-based volume cropping."""
-        self.image_stack = self.load_images()
+    def __init__(self, filename=r'./image_stack.tif'):
+        """
+        Initialize VTK-based volume cropping.
+        The TIFF stack is read on first access to image_stack, not here.
+        """
+        self.filename = filename
+        self._image_stack = None
         self.renderer = vtk.vtkRenderer()
         self.render_window = vtk.vtkRenderWindow()
         self.interactor = vtk.vtkRenderWindowInteractor()
@@ -22,9 +19,22 @@ class VTK3DReconstruction:
         self.planes = {}  # Store slicing planes
         self.plane_actors = {}  # Store plane actors for visualization
 
+    @property
+    def image_stack(self):
+        """The 3D image stack, loaded from filename on first use."""
+        if self._image_stack is None:
+            self._image_stack = self.load_images()
+        return self._image_stack
+
+    @image_stack.setter
+    def image_stack(self, value):
+        self._image_stack = value
+
     def load_images(self):
         """Load all TIFF images as a 3D numpy array."""
-        image_stack = tiff.TiffFile(r'./image_stack.tif').asarray(key=slice(None))
+        import tifffile as tiff
+
+        image_stack = tiff.TiffFile(self.filename).asarray(key=slice(None))
         return image_stack
 
     def create_vtk_volume(self):
@@ -141,6 +151,8 @@ class VTK3DReconstruction:
 
     def display_slices(self, slice_index=None):
         """Display slices along XY, YZ, and XZ planes."""
+        import matplotlib.pyplot as plt
+
         if slice_index is None:
             slice_index = self.image_stack.shape[0] // 2  # Default to middle slice
 
@@ -201,6 +213,8 @@ class VTK3DReconstruction:
 
     def animate_slices(self, output_file=r"./slices_animation.avi", fps=10):
         """Create an animation from slices of the volume dataset in XY, YZ, and XZ planes."""
+        import cv2
+
         print(f"Creating animation: {output_file}")
 
         depth, height, width = self.image_stack.shape
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+ndimage = pytest.importorskip("scipy.ndimage")
+
+from FIB_Analysis import ParticleAnalyzer
+
+SHAPE = (20, 24, 28)
+SPACING = (2.0, 0.5, 1.5)
+RANKS = {6: 1, 18: 2, 26: 3}
+
+
+def _random_mask(seed):
+    """Blobby random mask whose particles cross many chunk borders."""
+    rng = np.random.default_rng(seed)
+    return ndimage.gaussian_filter(rng.random(SHAPE), 1.0) > 0.52
+
+
+def _analyzer(mask, connectivity):
+    # A budget of three slices forces seven chunks along z.
+    budget = 3 * SHAPE[1] * SHAPE[2] * ParticleAnalyzer.BYTES_PER_VOXEL
+    analyzer = ParticleAnalyzer(mask.astype(np.uint8), spacing=SPACING,
+                                connectivity=connectivity, memory_budget=budget)
+    assert len(analyzer._chunks()) > 1
+    return analyzer
+
+
+def _exposed_faces(labels, label):
+    """Faces of one label's voxels that border another label or the outside, per axis."""
+    inside = np.pad(labels == label, 1)
+    same = np.pad(labels, 1) == label
+    faces = []
+    for axis in range(3):
+        count = 0
+        for shift in (1, -1):
+            count += np.count_nonzero(inside & ~np.roll(same, shift, axis=axis))
+        faces.append(count)
+    return faces
+
+
+@pytest.mark.parametrize("connectivity", [6, 18, 26])
+def test_chunked_labels_match_whole_volume_labelling(connectivity):
+    mask = _random_mask(connectivity)
+    labels, count = _analyzer(mask, connectivity).label()
+    structure = ndimage.generate_binary_structure(3, RANKS[connectivity])
+    expected, expected_count = ndimage.label(mask, structure=structure)
+    assert count == expected_count
+    np.testing.assert_array_equal(labels, expected)
+
+
+@pytest.mark.parametrize("connectivity", [6, 18, 26])
+def test_measurements_match_direct_computation(connectivity):
+    mask = _random_mask(100 + connectivity)
+    analyzer = _analyzer(mask, connectivity)
+    labels, count = analyzer.label()
+    measured = analyzer.measure()
+    sz, sy, sx = SPACING
+    assert len(measured["label"]) == count
+    for row, label in enumerate(measured["label"]):
+        voxels = np.argwhere(labels == label)
+        assert measured["voxel_count"][row] == len(voxels)
+        assert measured["volume"][row] == pytest.approx(len(voxels) * sz * sy * sx)
+        centroid = voxels.mean(axis=0) * SPACING
+        assert measured["centroid_z"][row] == pytest.approx(centroid[0])
+        assert measured["centroid_y"][row] == pytest.approx(centroid[1])
+        assert measured["centroid_x"][row] == pytest.approx(centroid[2])
+        faces_z, faces_y, faces_x = _exposed_faces(labels, label)
+        area = faces_z * sy * sx + faces_y * sz * sx + faces_x * sz * sy
+        assert measured["surface_area"][row] == pytest.approx(area)
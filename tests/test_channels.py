@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+tiff = pytest.importorskip("tifffile")
+
+from FIB_Channels import read_channels
+
+DEPTH = 4
+
+
+def _write_stack(path, shape=(6, 7), dtype=np.uint8, value=1):
+    stack = np.full((DEPTH,) + shape, value, dtype=dtype)
+    tiff.imwrite(path, stack, photometric="minisblack")
+    return stack
+
+
+def test_channel_files_with_mixed_dtypes_are_widened(tmp_path):
+    se = _write_stack(tmp_path / "se.tif", dtype=np.uint8, value=200)
+    bse = _write_stack(tmp_path / "bse.tif", dtype=np.uint16, value=1000)
+    channels = read_channels([str(tmp_path / "se.tif"), str(tmp_path / "bse.tif")])
+    assert channels.dtype == np.uint16
+    np.testing.assert_array_equal(channels[0], se)
+    np.testing.assert_array_equal(channels[1], bse)
+
+
+def test_channel_files_with_different_slice_shapes_are_rejected(tmp_path):
+    _write_stack(tmp_path / "se.tif", shape=(6, 7))
+    _write_stack(tmp_path / "bse.tif", shape=(6, 8))
+    with pytest.raises(ValueError, match="shape"):
+        read_channels([str(tmp_path / "se.tif"), str(tmp_path / "bse.tif")])
+
+
+def test_channel_file_with_a_mismatched_later_page_is_rejected(tmp_path):
+    _write_stack(tmp_path / "se.tif")
+    with tiff.TiffWriter(tmp_path / "bse.tif") as writer:
+        for z in range(DEPTH):
+            writer.write(np.ones((6, 8) if z == 2 else (6, 7), dtype=np.uint8), photometric="minisblack")
+    with pytest.raises(ValueError, match="Page 2"):
+        read_channels([str(tmp_path / "se.tif"), str(tmp_path / "bse.tif")])
+
+
+def test_interleaved_stack_is_split_by_page(tmp_path):
+    stack = np.arange(2 * DEPTH * 6 * 7, dtype=np.uint16).reshape(2 * DEPTH, 6, 7)
+    tiff.imwrite(tmp_path / "stack.tif", stack, photometric="minisblack")
+    channels = read_channels(str(tmp_path / "stack.tif"), n_channels=2)
+    np.testing.assert_array_equal(channels[0], stack[0::2])
+    np.testing.assert_array_equal(channels[1], stack[1::2])
+
+
+def test_interleaved_stack_with_a_mismatched_page_is_rejected(tmp_path):
+    with tiff.TiffWriter(tmp_path / "stack.tif") as writer:
+        for i in range(2 * DEPTH):
+            writer.write(np.ones((5, 7) if i == 5 else (6, 7), dtype=np.uint8), photometric="minisblack")
+    with pytest.raises(ValueError, match="Page 5"):
+        read_channels(str(tmp_path / "stack.tif"), n_channels=2)
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy packages that must only be imported when the features needing them are used.
+HEAVY_MODULES = ("vtk", "vtkmodules", "cv2", "tifffile", "PySide6", "scipy", "matplotlib")
+
+# Seconds allowed for a cold `import FIB_Tomo`, including NumPy.
+IMPORT_TIME_BUDGET = 1.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import FIB_Tomo
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_fib_tomo():
+    """Import FIB_Tomo in a fresh interpreter and return its import time and loaded modules."""
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_heavy_modules():
+    loaded = _import_fib_tomo()["modules"]
+    heavy = [name for name in loaded if name.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+
+
+def test_import_time_within_budget():
+    # Best of three, so a cold disk cache on the first run does not fail the test.
+    elapsed = min(_import_fib_tomo()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_TIME_BUDGET, f"import FIB_Tomo took {elapsed:.3f} s"
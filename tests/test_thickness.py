@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+ndimage = pytest.importorskip("scipy.ndimage")
+
+import FIB_Thickness
+from FIB_Thickness import distance_transform, local_thickness
+
+SHAPE = (12, 15, 17)
+SPACING = (2.0, 0.5, 1.5)
+# Chunks much thinner than every axis, so each pass crosses several chunk borders.
+CHUNK = 4
+# Radii that no voxel-to-voxel distance on the SPACING grid equals exactly.
+RADII = (0.9, 1.7, 2.3, 3.1, 3.9)
+
+
+def _random_mask(seed, threshold=0.48):
+    """Blobby random mask with structures a few voxels thick."""
+    rng = np.random.default_rng(seed)
+    return ndimage.gaussian_filter(rng.random(SHAPE), 1.2) > threshold
+
+
+def _brute_force_thickness(mask, radii):
+    """
+    Hildebrand-Ruegsegger by definition: for each radius, every voxel of the phase
+    at least that far from the background is a centre, and every voxel strictly
+    within the radius of a centre gets twice the radius; the largest value wins.
+    """
+    distance = ndimage.distance_transform_edt(mask, sampling=SPACING)
+    points = np.argwhere(mask) * SPACING
+    voxels = np.argwhere(mask)
+    thickness = np.zeros(mask.shape)
+    for radius in radii:
+        centres = points[distance[mask] >= radius]
+        if len(centres) == 0:
+            continue
+        squared = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=-1).min(axis=1)
+        covered = voxels[squared < radius * radius]
+        thickness[tuple(covered.T)] = 2.0 * radius
+    return thickness
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_distance_transform_matches_scipy(seed):
+    mask = _random_mask(seed, threshold=0.45)
+    expected = ndimage.distance_transform_edt(mask, sampling=SPACING)
+    distance = distance_transform(mask, SPACING, workers=2, chunk=CHUNK)
+    np.testing.assert_allclose(distance, expected, rtol=1e-6)
+    squared = distance_transform(mask, SPACING, workers=2, chunk=CHUNK, squared=True)
+    np.testing.assert_allclose(squared, expected ** 2, rtol=1e-6)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+# A zero cost finds every sphere with the cropped distance transform, a huge one paints them all.
+@pytest.mark.parametrize("edt_cost", [0, 10 ** 9])
+def test_local_thickness_matches_brute_force(seed, edt_cost, monkeypatch):
+    monkeypatch.setattr(FIB_Thickness, "_EDT_COST_PER_VOXEL", edt_cost)
+    mask = _random_mask(10 + seed)
+    expected = _brute_force_thickness(mask, RADII)
+    assert np.unique(expected).size > 3
+    thickness = local_thickness(mask, SPACING, sizes=RADII, workers=2, chunk=CHUNK)
+    np.testing.assert_allclose(thickness, expected, rtol=1e-6)